@@ -1,9 +1,12 @@
+from functools import lru_cache
+
 import numpy as np
 import pandas as pd
-from scipy.stats import chi2
 
 from backtests.christoffersen_method import christoffersen_independence
 from backtests.kupiec_pof import kupiec_pof
+from varlib.instrument import instrument
+from varlib.return_matrix import as_series
 
 
 def exceedances(port_ret: pd.Series, var_series: pd.Series) -> pd.Series:
@@ -20,31 +23,49 @@ def lr_cc(hits: pd.Series, alpha: float) -> tuple[float, float]:
     LRcc (conditional coverage) both Kupiec and Christoffersen conditions together.
     This is the main "checker", if p>0.05, good.
     """
+    from scipy.stats import chi2
     LR_uc, p_uc, _ = kupiec_pof(hits, alpha)
     LR_ind, p_ind = christoffersen_independence(hits)
     LR_cc = LR_uc + LR_ind
     p_cc = 1 - chi2.cdf(LR_cc, df=2)
     return float(LR_cc), float(p_cc)
 
+@lru_cache(maxsize=None)
+def traffic_light_table(T: int, alpha: float) -> np.ndarray:
+    """
+    Zone for every possible exceedance count x = 0..T, from exact binomial cutoffs (X ~ Bin(T, 1-α)):
+      green  if P(X <= x) < 95%
+      yellow if P(X <= x) < 99.99%
+      red    otherwise
+    (Basel: for 99% and T=250 this gives 0–4 green, 5–9 yellow, ≥10 red.)
+    Computed once per (T, alpha) and cached, later calls are a lookup.
+    """
+    from scipy.stats import binom
+    cdf = binom.cdf(np.arange(T + 1), T, 1 - alpha)
+    return np.where(cdf < 0.95, "green", np.where(cdf < 0.9999, "yellow", "red"))
+
+
 def basel_traffic_light(x: int, T: int, alpha: float) -> str:
     """
-    Basel reference (for 99% and T≈250):
-      0–4 green, 5–9 yellow, ≥10 red.
-    For other T/apha no selected colors, only n/a.
+    Basel traffic light zone for x exceedances in T days at level alpha (any T and alpha),
+    read from traffic_light_table. "n/a" if T = 0.
     """
-    if abs(alpha - 0.99) < 1e-6 and 200 <= T <= 300:
-        if x <= 4: return "green"
-        if x <= 9: return "yellow"
-        return "red"
-    return "n/a"
+    if T <= 0:
+        return "n/a"
+    return str(traffic_light_table(int(T), round(float(alpha), 10))[min(int(x), int(T))])
 
+@instrument
 def summarize_backtests(port_ret: pd.Series, var_series: pd.Series, alpha: float, label: str) -> pd.DataFrame:
+    from scipy.stats import chi2
+    port_ret = as_series(port_ret)
     hits = exceedances(port_ret, var_series)
     T = len(hits)
 
     LR_uc, p_uc, X = kupiec_pof(hits, alpha)
     LR_ind, p_ind = christoffersen_independence(hits)
-    LRcc, p_cc = lr_cc(hits, alpha)
+    # LRcc = LR_uc + LR_ind, both are already computed above (lr_cc would run them again)
+    LRcc = LR_uc + LR_ind
+    p_cc = float(1 - chi2.cdf(LRcc, df=2))
 
     row = {
         "method": label,
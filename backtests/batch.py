@@ -0,0 +1,124 @@
+from __future__ import annotations
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from backtests.backtests import basel_traffic_light
+from varlib.instrument import instrument
+from varlib.return_matrix import as_frame
+
+_EPS = 1e-12
+
+
+def _ln(p: np.ndarray) -> np.ndarray:
+    return np.log(np.clip(p, _EPS, 1 - _EPS))
+
+
+def batch_kupiec(T: np.ndarray, X: np.ndarray, alpha: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """kupiec_pof for many series at once (T, X, alpha are arrays of the same shape)."""
+    from scipy.stats import chi2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pi_hat = np.where(T > 0, X / np.maximum(T, 1), 0.0)
+    pi_hat = np.clip(pi_hat, _EPS, 1 - _EPS)
+    p = np.clip(1 - alpha, _EPS, 1 - _EPS)
+    LR_uc = -2 * ((T - X) * np.log((1 - p) / (1 - pi_hat)) + X * np.log(p / pi_hat))
+    return LR_uc, 1 - chi2.cdf(LR_uc, df=1)
+
+
+def batch_christoffersen(n00, n01, n10, n11, T: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """christoffersen_independence for many series from their transition counts (NaN where T < 2)."""
+    from scipy.stats import chi2
+    n0x, n1x = n00 + n01, n10 + n11
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pi01 = np.where(n0x > 0, n01 / np.maximum(n0x, 1), 0.0)
+        pi11 = np.where(n1x > 0, n11 / np.maximum(n1x, 1), 0.0)
+    pi = (n01 + n11) / (n00 + n01 + n10 + n11 + _EPS)
+    lnL1 = n00 * _ln(1 - pi01) + n01 * _ln(pi01) + n10 * _ln(1 - pi11) + n11 * _ln(pi11)
+    lnL0 = (n00 + n10) * _ln(1 - pi) + (n01 + n11) * _ln(pi)
+    LR_ind = -2 * (lnL0 - lnL1)
+    p_ind = 1 - chi2.cdf(LR_ind, df=1)
+    short = T < 2
+    return np.where(short, np.nan, LR_ind), np.where(short, np.nan, p_ind)
+
+
+def hit_counts(returns: np.ndarray, var: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Hit statistics for every column of a (T x M) VaR matrix.
+    Rows where the return or the VaR is NaN are skipped per column (same as the dropna alignment in exceedances),
+    and transitions are counted between consecutive VALID rows of each column:
+    the previous valid row is found with a running maximum of row numbers, no loop over columns or dates.
+    Returns T, X (exceedances) and the transition counts n00, n01, n10, n11 (arrays of length M).
+    """
+    valid = ~np.isnan(returns) & ~np.isnan(var)
+    with np.errstate(invalid="ignore"):
+        hits = valid & (-returns > var)
+
+    rows = np.arange(valid.shape[0])[:, None]
+    last_valid = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+    prev_idx = np.vstack([np.full((1, valid.shape[1]), -1), last_valid[:-1]])
+    has_prev = valid & (prev_idx >= 0)
+    prev_hit = np.take_along_axis(hits, np.maximum(prev_idx, 0), axis=0)
+
+    n11 = (has_prev & prev_hit & hits).sum(axis=0)
+    n10 = (has_prev & prev_hit & ~hits).sum(axis=0)
+    n01 = (has_prev & ~prev_hit & hits).sum(axis=0)
+    n00 = has_prev.sum(axis=0) - n11 - n10 - n01
+    return {"T": valid.sum(axis=0), "X": hits.sum(axis=0), "n00": n00, "n01": n01, "n10": n10, "n11": n11}
+
+
+@instrument
+def batch_backtest(
+    port_ret: pd.Series | pd.DataFrame,
+    var_matrix: pd.DataFrame,
+    alpha: float | Sequence[float] | pd.Series,
+    chunk_size: int = 4096,
+) -> pd.DataFrame:
+    """
+    summarize_backtests for many VaR series at once (many models / alphas / portfolios).
+    var_matrix: T x M, one VaR series per column.
+    port_ret:   one return Series used for every column, or a T x M frame (column m = returns of series m).
+    alpha:      one level, a list with one level per column, or a Series indexed like var_matrix.columns.
+
+    Hits, Kupiec, Christoffersen and LRcc are computed with NumPy over the whole matrix
+    (in chunks of columns to bound memory). LRcc reuses LR_uc and LR_ind.
+    Returns one row per column, same columns as summarize_backtests.
+    """
+    from scipy.stats import chi2
+    port_ret = as_frame(port_ret)
+    cols = var_matrix.columns
+    if isinstance(alpha, pd.Series):
+        alphas = alpha.reindex(cols).to_numpy(dtype=float)
+    else:
+        alphas = np.broadcast_to(np.asarray(alpha, dtype=float), (len(cols),)).copy()
+
+    if isinstance(port_ret, pd.DataFrame):
+        r_all = port_ret.reindex(var_matrix.index).to_numpy(dtype=float)
+    else:
+        r_all = port_ret.reindex(var_matrix.index).to_numpy(dtype=float)[:, None]
+    v_all = var_matrix.to_numpy(dtype=float)
+
+    parts = []
+    for a in range(0, len(cols), chunk_size):
+        b = min(a + chunk_size, len(cols))
+        r = r_all[:, a:b] if r_all.shape[1] > 1 else r_all
+        parts.append(hit_counts(np.broadcast_to(r, (r.shape[0], b - a)), v_all[:, a:b]))
+    c = {k: np.concatenate([p[k] for p in parts]).astype(float) for k in parts[0]}
+
+    LR_uc, p_uc = batch_kupiec(c["T"], c["X"], alphas)
+    LR_ind, p_ind = batch_christoffersen(c["n00"], c["n01"], c["n10"], c["n11"], c["T"])
+    LRcc = LR_uc + LR_ind
+    p_cc = 1 - chi2.cdf(LRcc, df=2)
+
+    T, X = c["T"].astype(int), c["X"].astype(int)
+    out = pd.DataFrame({
+        "method": cols,
+        "alpha": alphas,
+        "T": T,
+        "exceedances": X,
+        "Kupiec_LR": LR_uc, "Kupiec_p": p_uc,
+        "Christ_LR": LR_ind, "Christ_p": p_ind,
+        "LRcc": LRcc, "LRcc_p": p_cc,
+        "traffic_light": [basel_traffic_light(x, t, al) for x, t, al in zip(X, T, alphas)],
+    })
+    return out.set_index("method")
@@ -1,6 +1,5 @@
 import numpy as np
 import pandas as pd
-from scipy.stats import chi2
 
 def christoffersen_independence(hits: pd.Series) -> tuple[float, float]:
     """
@@ -11,16 +10,16 @@ def christoffersen_independence(hits: pd.Series) -> tuple[float, float]:
 
     LR_ind ~ Chi2(1)
     """
+    from scipy.stats import chi2
     h = hits.values.astype(int)
     if h.size < 2:
         return np.nan, np.nan
-    n00 = n01 = n10 = n11 = 0
-    for i in range(1, len(h)):
-        prev, curr = h[i - 1], h[i]
-        if prev == 0 and curr == 0: n00 += 1
-        elif prev == 0 and curr == 1: n01 += 1
-        elif prev == 1 and curr == 0: n10 += 1
-        else: n11 += 1
+    # transition counts prev -> curr, counted on the whole array at once
+    prev, curr = h[:-1] != 0, h[1:] != 0
+    n01 = int(np.count_nonzero(~prev & curr))
+    n10 = int(np.count_nonzero(prev & ~curr))
+    n11 = int(np.count_nonzero(prev & curr))
+    n00 = prev.size - n01 - n10 - n11
 
     eps = 1e-12
     n0x = n00 + n01
@@ -0,0 +1,189 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from varlib.instrument import instrument
+from varlib.return_matrix import as_frame, as_series
+
+
+def _as_matrix(obj: pd.Series | pd.DataFrame, index: pd.Index) -> np.ndarray:
+    a = obj.reindex(index).to_numpy(dtype=float)
+    return a[:, None] if a.ndim == 1 else a
+
+
+def z_statistics(losses: np.ndarray, var: np.ndarray, es: np.ndarray, mask: np.ndarray, p: np.ndarray):
+    """
+    Acerbi–Székely statistics along the last axis (time), any leading shape. Loss convention (L = -r, positive = loss):
+    I_t = 1{L_t > VaR_t}
+    Z1 = 1 - (1/N_T) Σ L_t I_t / ES_t        (N_T = number of exceedances; 0 if there are none)
+    Z2 = 1 - Σ L_t I_t / (T (1-α) ES_t)
+    Under the null (ES correct) both are ~0; negative values = ES too low.
+    """
+    hit = mask & (losses > var)
+    ratio = np.where(hit, losses / np.where(mask, es, 1.0), 0.0).sum(axis=-1)
+    n_hit = hit.sum(axis=-1)
+    T = mask.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z1 = np.where(n_hit > 0, 1 - ratio / np.maximum(n_hit, 1), 0.0)
+        z2 = 1 - ratio / (T * p)
+    return z1, z2
+
+
+def _null_params(var: np.ndarray, es: np.ndarray, alpha: np.ndarray, dist: str, df: float):
+    """
+    Location/scale of the predicted loss distribution, backed out of the (VaR, ES) pair:
+    L = μ + σ ε, VaR = μ + σ q, ES = μ + σ k  ->  σ = (ES - VaR)/(k - q), μ = VaR - σ q,
+    q, k = quantile and tail mean of ε at α (normal, or Student-t with `df` degrees of freedom).
+    """
+    from scipy.stats import norm, t as student_t
+    if dist == "normal":
+        q = norm.ppf(alpha)
+        k = norm.pdf(q) / (1 - alpha)
+    elif dist == "t":
+        q = student_t.ppf(alpha, df)
+        k = student_t.pdf(q, df) / (1 - alpha) * (df + q ** 2) / (df - 1)
+    else:
+        raise ValueError("dist must be 'normal' or 't'.")
+    sigma = (es - var) / (k - q)[:, None]
+    mu = var - sigma * q[:, None]
+    return mu, sigma
+
+
+def _chunk_reps(M: int, T: int, dist: str, max_memory_mb: float) -> int:
+    """
+    Replications per chunk so that one chunk's (M, n_rep, T) buffers stay under max_memory_mb:
+    float32 draws (4 bytes) and the bool exceedance mask (1 byte), plus float32 chi-square draws for dist="t".
+    """
+    per_rep = M * T * (4 + 1 + (4 if dist == "t" else 0))
+    return max(1, int(max_memory_mb * 2 ** 20) // max(1, per_rep))
+
+
+def _score_f32(L: np.ndarray, var: np.ndarray, es: np.ndarray, mask: np.ndarray, p: np.ndarray):
+    """
+    Z1, Z2 of float32 losses L (M, R, T), shape (M, R), scored in place: exceedances and L/ES in float32,
+    sums in float64. Simulated and observed paths both go through here, so they are ranked at the same precision.
+    """
+    f32 = lambda a: a[:, None, :].astype(np.float32)
+    hit = L > f32(var)
+    hit &= mask[:, None, :]
+    L *= f32(np.where(mask, 1.0 / es, 0.0))
+    L *= hit
+    ratio = L.sum(axis=-1, dtype=np.float64)
+    n_hit = hit.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z1 = np.where(n_hit > 0, 1 - ratio / np.maximum(n_hit, 1), 0.0)
+        z2 = 1 - ratio / (mask.sum(axis=-1) * p)[:, None]
+    return z1, z2
+
+
+def _simulate_chunk(args) -> tuple[np.ndarray, np.ndarray]:
+    """
+    One chunk of replications: all paths of all series drawn and scored as one (M, R, T) float32 array,
+    in place (one buffer for draws, losses and L/ES). Student-t draws are built in float32 as
+    Z / sqrt(2 G / df), G ~ Gamma(df/2) (i.e. chi-square(df) / 2), never as a float64 array.
+    Returns the counts of simulated Z <= observed Z per series (observed Z scored by _score_f32 as well).
+    """
+    seed, n_rep, mu, sigma, var, es, mask, p, dist, df, z1_obs, z2_obs = args
+    rng = np.random.default_rng(seed)
+    M, T = mu.shape
+    L = rng.standard_normal((M, n_rep, T), dtype=np.float32)
+    if dist == "t":
+        g = rng.standard_gamma(df / 2, (M, n_rep, T), dtype=np.float32)
+        g *= np.float32(2 / df)
+        np.sqrt(g, out=g)
+        L /= g
+        del g
+    L *= sigma[:, None, :].astype(np.float32)
+    L += mu[:, None, :].astype(np.float32)
+    z1, z2 = _score_f32(L, var, es, mask, p)
+    return (z1 <= z1_obs[:, None]).sum(axis=1), (z2 <= z2_obs[:, None]).sum(axis=1)
+
+
+@instrument
+def acerbi_szekely_test(
+    port_ret: pd.Series | pd.DataFrame,
+    var_matrix: pd.DataFrame,
+    es_matrix: pd.DataFrame,
+    alpha: float | Sequence[float],
+    n_sims: int = 10_000,
+    dist: str = "normal",
+    df: float = 5.0,
+    max_memory_mb: float = 64.0,
+    n_jobs: Optional[int] = 1,
+    random_seed: int = 42,
+) -> pd.DataFrame:
+    """
+    Acerbi–Székely Z1 / Z2 ES backtests for many series at once (columns of var_matrix / es_matrix, T x M).
+    port_ret: one return Series for all columns, or a T x M frame.
+
+    p-values by simulation under the null: each day's loss distribution is the model's own
+    (normal, or Student-t with df), with location/scale backed out of its VaR and ES.
+    Replications are generated in chunks sized from the byte budget max_memory_mb over the (M, n_rep, T) arrays
+    (per worker); every chunk draws and scores all M series and all paths as one float32 array.
+    Chunks get their own seed (SeedSequence.spawn), so with n_jobs > 1 they run on a process pool
+    and the p-values do not depend on the number of workers.
+    p = share of simulated Z <= observed Z (one-sided: small p = ES too low); for the ranking the observed losses
+    are scored in float32 like the simulated ones, the reported Z1 / Z2 are the float64 statistics.
+    Returns one row per column: T, exceedances, Z1, Z1_p, Z2, Z2_p.
+    """
+    port_ret = as_frame(port_ret)
+    idx = var_matrix.index
+    cols = var_matrix.columns
+    var = var_matrix.to_numpy(dtype=float).T
+    es = es_matrix.reindex(index=idx, columns=cols).to_numpy(dtype=float).T
+    r = _as_matrix(port_ret, idx)
+    losses = np.broadcast_to(-r, (len(idx), len(cols))).T
+    alphas = np.broadcast_to(np.asarray(alpha, dtype=float), (len(cols),)).copy()
+    p = 1 - alphas
+
+    mask = ~np.isnan(losses) & ~np.isnan(var) & ~np.isnan(es)
+    var_f, es_f = np.where(mask, var, 0.0), np.where(mask, es, 1.0)
+    z1_obs, z2_obs = z_statistics(np.where(mask, losses, 0.0), var_f, es_f, mask, p)
+    mu, sigma = _null_params(var_f, es_f, alphas, dist, df)
+    obs = np.where(mask, losses, 0.0)[:, None, :].astype(np.float32)
+    z1_rank, z2_rank = (z[:, 0] for z in _score_f32(obs, var_f, es_f, mask, p))
+
+    chunk_size = _chunk_reps(*mu.shape, dist, max_memory_mb)
+    sizes = [min(chunk_size, n_sims - a) for a in range(0, n_sims, chunk_size)]
+    seeds = np.random.SeedSequence(random_seed).spawn(len(sizes))
+    tasks = [(s, n, mu, sigma, var_f, es_f, mask, p, dist, df, z1_rank, z2_rank)
+             for s, n in zip(seeds, sizes)]
+    if n_jobs == 1:
+        results = [_simulate_chunk(x) for x in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+    c1 = sum(x[0] for x in results)
+    c2 = sum(x[1] for x in results)
+
+    hits = (mask & (losses > var_f)).sum(axis=1)
+    return pd.DataFrame({
+        "method": cols,
+        "alpha": alphas,
+        "T": mask.sum(axis=1),
+        "exceedances": hits,
+        "Z1": z1_obs, "Z1_p": c1 / n_sims,
+        "Z2": z2_obs, "Z2_p": c2 / n_sims,
+    }).set_index("method")
+
+
+def es_backtest(
+    port_ret: pd.Series,
+    var_series: pd.Series,
+    es_series: pd.Series,
+    alpha: float,
+    label: str,
+    n_sims: int = 10_000,
+    dist: str = "normal",
+    df: float = 5.0,
+    random_seed: int = 42,
+) -> pd.DataFrame:
+    """Acerbi–Székely Z1/Z2 for one model (one-row table, like summarize_backtests)."""
+    port_ret = as_series(port_ret)
+    return acerbi_szekely_test(
+        port_ret, var_series.to_frame(label), es_series.to_frame(label), alpha,
+        n_sims=n_sims, dist=dist, df=df, random_seed=random_seed,
+    )
@@ -1,6 +1,5 @@
 import numpy as np
 import pandas as pd
-from scipy.stats import chi2
 
 def kupiec_pof(hits: pd.Series, alpha: float) -> tuple[float, float, int]:
     """
@@ -11,6 +10,7 @@ def kupiec_pof(hits: pd.Series, alpha: float) -> tuple[float, float, int]:
     p = 1 - alpha (example 0.01 for 99%).
     LR_uc ~ Chi2(1)
     """
+    from scipy.stats import chi2
     T = len(hits)
     X = int(hits.sum())
     p = 1 - alpha
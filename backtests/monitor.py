@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from backtests.backtests import exceedances, traffic_light_table
+from backtests.batch import batch_christoffersen, batch_kupiec
+from varlib.instrument import instrument
+from varlib.return_matrix import as_series
+
+
+@instrument
+def rolling_backtest_monitor(
+    port_ret: pd.Series,
+    var_series: pd.Series,
+    alpha: float,
+    window: int = 250,
+) -> pd.DataFrame:
+    """
+    Backtest statistics on a rolling window of the last `window` observations, for every date.
+    Instead of running summarize_backtests on each window, exceedances and 2x2 transition counts come from
+    prefix sums: count in window = S[t] - S[t-window], i.e. O(1) per day.
+    Kupiec / Christoffersen / LRcc p-values are then computed for all dates at once,
+    and the traffic-light zone is a lookup in traffic_light_table(window, alpha) (exact binomial cutoffs).
+
+    Dates are the aligned (non-NaN) dates of exceedances(); the first window-1 rows are NaN.
+    Columns: T, exceedances, hit_rate, Kupiec_p, Christ_p, LRcc_p, traffic_light.
+    """
+    from scipy.stats import chi2
+    port_ret = as_series(port_ret)
+    hits = exceedances(port_ret, var_series)
+    h = hits.to_numpy().astype(bool)
+    n = h.size
+
+    out = pd.DataFrame(index=hits.index, columns=["T", "exceedances", "hit_rate", "Kupiec_p", "Christ_p", "LRcc_p"],
+                       dtype=float)
+    out["traffic_light"] = pd.Series(np.nan, index=hits.index, dtype=object)
+    if n < window:
+        # shorter history than one window (new portfolio, short run): no complete window yet
+        return out
+
+    # prefix sums of hits and of the transitions (h[i-1] -> h[i]) ending at i
+    S_x = np.concatenate([[0], np.cumsum(h)])
+    prev = np.concatenate([[False], h[:-1]])
+    first = np.zeros(n, dtype=bool)
+    first[0] = True                       # row 0 has no predecessor
+    S_01 = np.concatenate([[0], np.cumsum(~first & ~prev & h)])
+    S_10 = np.concatenate([[0], np.cumsum(~first & prev & ~h)])
+    S_11 = np.concatenate([[0], np.cumsum(~first & prev & h)])
+
+    end = np.arange(window - 1, n)        # window = rows [end-window+1, end]
+    start = end - window + 1
+    X = S_x[end + 1] - S_x[start]
+    # transitions inside the window end at rows start+1 .. end
+    n01 = S_01[end + 1] - S_01[start + 1]
+    n10 = S_10[end + 1] - S_10[start + 1]
+    n11 = S_11[end + 1] - S_11[start + 1]
+    n00 = (window - 1) - n01 - n10 - n11
+
+    T = np.full(end.size, float(window))
+    LR_uc, p_uc = batch_kupiec(T, X.astype(float), np.full(end.size, alpha))
+    LR_ind, p_ind = batch_christoffersen(n00, n01, n10, n11, T)
+    p_cc = 1 - chi2.cdf(LR_uc + LR_ind, df=2)
+    zones = traffic_light_table(window, round(float(alpha), 10))[X] if window > 0 else np.full(end.size, "n/a")
+
+    out.iloc[window - 1:, :6] = np.column_stack([T, X, X / window, p_uc, p_ind, p_cc])
+    out.iloc[window - 1:, out.columns.get_loc("traffic_light")] = zones
+    return out
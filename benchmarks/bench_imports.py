@@ -0,0 +1,98 @@
+"""
+Start-up cost: wall time of a fresh interpreter that imports one module (or runs the CLI --help), and which heavy
+libraries that drags in.
+
+    python -m benchmarks.bench_imports
+    python -m benchmarks.bench_imports --repeat 10 --targets varlib.cli varlib.var_history
+
+Each target runs in its own `python -c` process (nothing cached in sys.modules), time = best of --repeat.
+"baseline" is the bare interpreter; scipy.stats / matplotlib.pyplot / pandas are listed for reference.
+Results go to benchmarks/results/imports-<UTC time>.json.
+"""
+from __future__ import annotations
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+HEAVY = ("numpy", "pandas", "scipy", "matplotlib", "yfinance")
+
+TARGETS = (
+    "varlib.cli --help",
+    "varlib.cli",
+    "varlib.data_creator",
+    "varlib.var_history",
+    "varlib.var_parametric",
+    "varlib.var_montecarlo",
+    "varlib.orchestrator",
+    "backtests.backtests",
+    "backtests.batch",
+    "varlib.plots",
+    "pandas",
+    "scipy.stats",
+    "matplotlib.pyplot",
+)
+
+
+def _code(target: str) -> str:
+    if target == "baseline":
+        return "import sys"
+    if target.endswith(" --help"):
+        module = target.split()[0]
+        return (f"import runpy, sys; sys.argv = ['{module}', '--help']\n"
+                f"try:\n    runpy.run_module('{module}', run_name='__main__')\nexcept SystemExit:\n    pass")
+    return f"import {target}"
+
+
+def _run(target: str, repeat: int) -> dict:
+    code = _code(target) + f"\nimport sys; print(','.join(m for m in {HEAVY!r} if m in sys.modules), file=sys.stderr)"
+    best, loaded = float("inf"), ""
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        best = min(best, time.perf_counter() - t0)
+        if proc.returncode != 0:
+            return {"target": target, "seconds": None, "loaded": [], "error": proc.stderr.strip().splitlines()[-1]}
+        loaded = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else ""
+    return {"target": target, "seconds": best, "loaded": [m for m in loaded.split(",") if m]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", type=Path, default=None,
+                        help="JSON file (default: benchmarks/results/imports-<UTC time>.json)")
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    out = args.out or Path("benchmarks/results") / f"imports-{now:%Y%m%dT%H%M%SZ}.json"
+    base = _run("baseline", args.repeat)["seconds"]
+    print(f"{'target':<28} {'sec':>8} {'- base':>8}  heavy modules loaded")
+    results = []
+    for target in args.targets:
+        r = _run(target, args.repeat)
+        results.append(r)
+        if r["seconds"] is None:
+            print(f"{target:<28} {'failed':>8} {'':>8}  {r['error']}")
+        else:
+            print(f"{target:<28} {r['seconds']:>8.3f} {r['seconds'] - base:>8.3f}  {' '.join(r['loaded']) or '-'}")
+
+    meta = {
+        "timestamp": now.isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "baseline_seconds": base,
+    }
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"meta": meta, "results": results}, indent=2))
+    print(f"\nwritten to {out}")
+
+
+if __name__ == "__main__":
+    main()
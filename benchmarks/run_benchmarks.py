@@ -0,0 +1,176 @@
+"""
+Benchmark suite on synthetic data: wall time, CPU time and peak memory of every stage over a grid of
+(T, N, window, n_simulations), written to JSON so runs can be compared over time.
+
+    python -m benchmarks.run_benchmarks --T 1000 2500 --N 5 50 --window 250 --sims 5000
+    python -m benchmarks.run_benchmarks --quick --compare benchmarks/results/<older run>.json
+
+Data comes from varlib.synthetic.synthetic_returns (multivariate t, regime-switching volatility, fixed seed),
+so no download is needed and every run sees the same numbers.
+Time = best of --repeat runs; peak memory = tracemalloc peak (Python + NumPy allocations) of one extra run.
+The slow per-date rolling_montecarlo_var_es loop is timed next to the batched engine on the small grid points
+(T * N <= LOOP_MC_MAX_CELLS, e.g. T=1000, N=5 in the default grid and the --quick run); --loop-mc times it everywhere.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from itertools import product
+from pathlib import Path
+from typing import Callable
+
+import matplotlib
+
+matplotlib.use("Agg")   # plots are saved to a temp dir, never shown
+
+import numpy as np
+import pandas as pd
+
+from backtests.backtests import summarize_backtests
+from backtests.monitor import rolling_backtest_monitor
+from varlib.plots import plot_kupiec_expected_vs_actual, plot_mc_loss_histogram, plot_pnl_vs_var
+from varlib.returns import portfolio_returns
+from varlib.synthetic import synthetic_returns, synthetic_weights
+from varlib.var_history import history_var_expected_loss
+from varlib.var_montecarlo import rolling_montecarlo_var_es, rolling_montecarlo_var_es_batched
+from varlib.var_parametric import rolling_parametric_var_es
+
+ALPHA = 0.99
+LOOP_MC_MAX_CELLS = 5_000       # per-date MC loop is timed by default only where T * N is at most this
+
+
+def _measure(fn: Callable[[], object], repeat: int) -> dict:
+    """Best wall / CPU time of `repeat` runs, then one run under tracemalloc for the peak."""
+    wall, cpu = [], []
+    for _ in range(repeat):
+        w0, c0 = time.perf_counter(), time.process_time()
+        fn()
+        wall.append(time.perf_counter() - w0)
+        cpu.append(time.process_time() - c0)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(wall), "cpu_seconds": min(cpu), "peak_mb": peak / 2 ** 20}
+
+
+def _stages(T: int, N: int, window: int, n_sims: int, fig_dir: Path, loop_mc: bool) -> dict[str, Callable]:
+    """
+    The benchmarked calls for one grid point (inputs prepared outside the timed part).
+    loop_mc adds the per-date rolling_montecarlo_var_es loop next to the batched engine.
+    """
+    rets = synthetic_returns(T, N)
+    weights = synthetic_weights(N)
+    r_p = portfolio_returns(rets, weights)
+    var = rolling_parametric_var_es(r_p, ALPHA, window)["VaR"]
+    table = summarize_backtests(r_p, var, ALPHA, "Parametric-N")
+
+    stages = {
+        "history_var_expected_loss": lambda: history_var_expected_loss(r_p, ALPHA, window),
+        "rolling_parametric_var_es": lambda: rolling_parametric_var_es(r_p, ALPHA, window),
+        "rolling_parametric_var_es[ewma]": lambda: rolling_parametric_var_es(r_p, ALPHA, window, use_ewma=True),
+        "rolling_montecarlo_var_es_batched": lambda: rolling_montecarlo_var_es_batched(
+            rets, weights, ALPHA, window, n_sims),
+        "summarize_backtests": lambda: summarize_backtests(r_p, var, ALPHA, "Parametric-N"),
+        "rolling_backtest_monitor": lambda: rolling_backtest_monitor(r_p, var, ALPHA),
+        "plot_pnl_vs_var": lambda: plot_pnl_vs_var(r_p, {"Parametric-N": var}, ALPHA, "Parametric-N",
+                                                   fig_dir / "pnl.png"),
+        "plot_pnl_vs_var[max_points=2000]": lambda: plot_pnl_vs_var(r_p, {"Parametric-N": var}, ALPHA,
+                                                                     "Parametric-N", fig_dir / "pnl.png",
+                                                                     max_points=2000),
+        "plot_kupiec_expected_vs_actual": lambda: plot_kupiec_expected_vs_actual(table, ALPHA,
+                                                                                 fig_dir / "kupiec.png"),
+        "plot_mc_loss_histogram": lambda: plot_mc_loss_histogram(rets, weights, window, n_sims, ALPHA,
+                                                                 fig_dir / "hist.png"),
+    }
+    if loop_mc:
+        stages["rolling_montecarlo_var_es"] = lambda: rolling_montecarlo_var_es(rets, weights, ALPHA, window, n_sims)
+    return stages
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(current: list[dict], path: Path) -> None:
+    """Print time / memory ratios against an older result file (matching config + stage)."""
+    old = json.loads(path.read_text())["results"]
+    key = lambda r: (r["T"], r["N"], r["window"], r["n_simulations"], r["stage"])
+    ref = {key(r): r for r in old}
+    print(f"\nvs {path.name}:")
+    print(f"{'stage':<36} {'T':>6} {'N':>5} {'time x':>7} {'mem x':>7}")
+    for r in current:
+        o = ref.get(key(r))
+        if o and o["seconds"] > 0:
+            mem = r["peak_mb"] / o["peak_mb"] if o["peak_mb"] > 0 else float("nan")
+            print(f"{r['stage']:<36} {r['T']:>6} {r['N']:>5} {r['seconds'] / o['seconds']:>7.2f} {mem:>7.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--T", type=int, nargs="+", default=[1000, 2500])
+    parser.add_argument("--N", type=int, nargs="+", default=[5, 50])
+    parser.add_argument("--window", type=int, nargs="+", default=[250])
+    parser.add_argument("--sims", type=int, nargs="+", default=[5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", nargs="*", default=None, help="run only these stages (default: all)")
+    parser.add_argument("--loop-mc", action="store_true",
+                        help=f"time the per-date rolling_montecarlo_var_es loop at every grid point "
+                             f"(default: only where T * N <= {LOOP_MC_MAX_CELLS})")
+    parser.add_argument("--quick", action="store_true", help="small grid (T=600, N=5, sims=2000, repeat=1)")
+    parser.add_argument("--out", type=Path, default=None, help="JSON file (default: benchmarks/results/<UTC time>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="older JSON result to compare against")
+    args = parser.parse_args()
+    if args.quick:
+        args.T, args.N, args.window, args.sims, args.repeat = [600], [5], [250], [2000], 1
+
+    now = datetime.now(timezone.utc)
+    out = args.out or Path("benchmarks/results") / f"{now:%Y%m%dT%H%M%SZ}.json"
+    results = []
+    print(f"{'stage':<36} {'T':>6} {'N':>5} {'win':>5} {'sims':>6} {'sec':>9} {'cpu':>9} {'peak MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for T, N, window, n_sims in product(args.T, args.N, args.window, args.sims):
+            if window >= T:
+                continue
+            stages = _stages(T, N, window, n_sims, Path(tmp), args.loop_mc or T * N <= LOOP_MC_MAX_CELLS)
+            for name, fn in stages.items():
+                if args.stages and name not in args.stages:
+                    continue
+                m = _measure(fn, args.repeat)
+                results.append({"stage": name, "T": T, "N": N, "window": window, "n_simulations": n_sims, **m})
+                print(f"{name:<36} {T:>6} {N:>5} {window:>5} {n_sims:>6} "
+                      f"{m['seconds']:>9.4f} {m['cpu_seconds']:>9.4f} {m['peak_mb']:>9.1f}")
+
+    meta = {
+        "timestamp": now.isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "alpha": ALPHA,
+        "loop_mc": "all" if args.loop_mc else f"T * N <= {LOOP_MC_MAX_CELLS}",
+    }
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"meta": meta, "results": results}, indent=2))
+    print(f"\nwritten to {out}")
+    if args.compare:
+        _compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
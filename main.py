@@ -1,12 +1,14 @@
 import pandas as pd
 from pathlib import Path
-from varlib.data_creator import load_prices_yf, to_log_returns
-from varlib.plots import plot_pnl_vs_var, plot_kupiec_expected_vs_actual, plot_mc_loss_histogram
+from varlib.data_creator import load_prices, to_log_returns
+from varlib.plots import render_figures, use_backend
 from varlib.returns import portfolio_returns
-from varlib.var_history import history_var_expected_loss
+from varlib.var_history import filtered_history_var_es, history_var_expected_loss
 from varlib.var_parametric import rolling_parametric_var_es
-from varlib.var_montecarlo import rolling_montecarlo_var_es
+from varlib.var_montecarlo import rolling_montecarlo_var_es_batched
 from backtests.backtests import summarize_backtests
+from backtests.monitor import rolling_backtest_monitor
+from varlib.instrument import configure, stage, summary_table, write_log
 
 # 1) Config
 tickers = ["AAPL", "MSFT", "AMZN", "TSM", "BA"]   # 5 liquid instruments
@@ -14,70 +16,85 @@ weights = {"AAPL": 0.25, "MSFT": 0.25, "AMZN": 0.25, "TSM": 0.15, "BA": 0.10}  #
 alpha_levels = [0.95, 0.99]     # probabilities for VaR
 window = 365
 
-# Prepare a place to save figures
+# Prepare a place to save figures (files only, no GUI backend)
 fig_dir = Path("reports/figs")
 fig_dir.mkdir(parents=True, exist_ok=True)
+use_backend("Agg")
+
+# Stage timings (wall / CPU / peak memory / counts) -> reports/run_log.json + table at the end.
+# VARLIB_PROFILE=1 (or a list of stage names) also writes cProfile dumps to reports/profiles.
+configure(enabled=True)
 
 # 2) Data
-prices = load_prices_yf(tickers, start="2022-01-01")
-rets = to_log_returns(prices)
+with stage("data"):
+    prices = load_prices(tickers, start="2022-01-01", store_dir="data/prices")  # local store, fetches only new days
+    rets = to_log_returns(prices)
 
 # This is everything in USD, if we mix with EUR, we need to convert.
 
 # 3) Portfolio returns
-r_p = portfolio_returns(rets, weights)
+with stage("portfolio returns"):
+    r_p = portfolio_returns(rets, weights)
 
 # 4) VaR models (rolling, out-of-sample)
+# Every model takes the whole alpha list: windows are sorted / simulated once,
+# each level is read from the same result (columns MultiIndex (alpha, VaR/ES)).
+with stage("VaR models"):
+    hs_all = history_var_expected_loss(r_p, alpha=alpha_levels, window=window)
+    fhs_all = filtered_history_var_es(r_p, alpha=alpha_levels, window=window, ewma_lambda=0.94)
+    par_all = rolling_parametric_var_es(r_p, alpha=alpha_levels, window=window, use_ewma=False)
+    par_ewma_all = rolling_parametric_var_es(r_p, alpha=alpha_levels, window=window, use_ewma=True, ewma_lambda=0.94)
+    mc_all = rolling_montecarlo_var_es_batched(rets, weights, alpha=alpha_levels, window=window, n_simulations=20000)
+
 results = {}
+fig_jobs = []
 
-# Recompute (or reuse if you kept them) per-alpha VaR series for plotting
 for a in alpha_levels:
-    hs = history_var_expected_loss(r_p, alpha=a, window=window)
-    par = rolling_parametric_var_es(r_p, alpha=a, window=window, use_ewma=False)
-    par_ewma = rolling_parametric_var_es(r_p, alpha=a, window=window, use_ewma=True, ewma_lambda=0.94)
-    mc = rolling_montecarlo_var_es(rets, weights, alpha=a, window=window, n_simulations=20000)
-
-    # Build backtest table and store it
-    tbl = pd.concat([
-        summarize_backtests(r_p, hs["VaR"], a, f"HS ({int(a * 100)}%)"),
-        summarize_backtests(r_p, par["VaR"], a, f"Parametric-N ({int(a * 100)}%)"),
-        summarize_backtests(r_p, par_ewma["VaR"], a, f"Parametric-EWMA ({int(a * 100)}%)"),
-        summarize_backtests(r_p, mc, a, f"MonteCarlo ({int(a * 100)}%)"),
-    ])
-    results[a] = tbl  # <- this prevents KeyError
-
-    var_dict = {
-        "HS": hs["VaR"],
-        "Parametric-N": par["VaR"],
-        "Parametric-EWMA": par_ewma["VaR"],
-        "MonteCarlo": mc,
-    }
-
-    # 1) P&L vs -VaR (exceedances marked for HS)
-    plot_pnl_vs_var(
-        port_ret=r_p,
-        var_dict=var_dict,
-        alpha=a,
-        highlight="HS",
-        savepath=fig_dir / f"pnl_vs_var_alpha{int(a*100)}.png",
-    )
-
-    # 2) Kupiec expected vs actual (uses results[a] that is already build)
-    plot_kupiec_expected_vs_actual(
-        backtest_table=results[a],
-        alpha=a,
-        savepath=fig_dir / f"kupiec_expected_vs_actual_alpha{int(a*100)}.png",
-    )
-
-# 3) Simple Monte Carlo histogram (last day), pick one alpha (example: 0.99)
-plot_mc_loss_histogram(
-    ret_df=rets,
-    weights=weights,
-    window=window,
-    n_sims=30000,
-    alpha=0.99,
-    savepath=fig_dir / "mc_loss_hist_alpha99.png",
-)
+    hs, fhs, par, par_ewma, mc = hs_all[a], fhs_all[a], par_all[a], par_ewma_all[a], mc_all[a]
+    pct = f"{a * 100:g}%"
+
+    with stage(f"backtests {pct}"):
+        # Build backtest table and store it
+        tbl = pd.concat([
+            summarize_backtests(r_p, hs["VaR"], a, f"HS ({pct})"),
+            summarize_backtests(r_p, fhs["VaR"], a, f"FHS ({pct})"),
+            summarize_backtests(r_p, par["VaR"], a, f"Parametric-N ({pct})"),
+            summarize_backtests(r_p, par_ewma["VaR"], a, f"Parametric-EWMA ({pct})"),
+            summarize_backtests(r_p, mc["VaR"], a, f"MonteCarlo ({pct})"),
+        ])
+        results[a] = tbl  # <- this prevents KeyError
+
+        var_dict = {
+            "HS": hs["VaR"],
+            "FHS": fhs["VaR"],
+            "Parametric-N": par["VaR"],
+            "Parametric-EWMA": par_ewma["VaR"],
+            "MonteCarlo": mc["VaR"],
+        }
+        # Rolling 250-day exceedance rate per method (prefix-sum monitor, O(1) per day)
+        monitors = {k: rolling_backtest_monitor(r_p, v, a, window=250) for k, v in var_dict.items()}
+
+    # Figures are collected as (kind, kwargs) jobs and drawn in one batch below
+    fig_jobs += [
+        # 1) P&L vs -VaR (exceedances marked for HS)
+        ("pnl_vs_var", dict(port_ret=r_p, var_dict=var_dict, alpha=a, highlight="HS",
+                            savepath=fig_dir / f"pnl_vs_var_alpha{a * 100:g}.png")),
+        # 2) Kupiec expected vs actual (uses results[a] that is already build)
+        ("kupiec_expected_vs_actual", dict(backtest_table=results[a], alpha=a,
+                                           savepath=fig_dir / f"kupiec_expected_vs_actual_alpha{a * 100:g}.png")),
+        # 3) Rolling exceedance rate per method
+        ("rolling_hitrate", dict(monitors=monitors, alpha=a,
+                                 savepath=fig_dir / f"rolling_hitrate_alpha{a * 100:g}.png")),
+    ]
+
+# 4) Simple Monte Carlo histogram (last day), pick one alpha (example: 0.99)
+fig_jobs.append(("mc_loss_histogram", dict(ret_df=rets, weights=weights, window=window, n_sims=30000, alpha=0.99,
+                                           savepath=fig_dir / "mc_loss_hist_alpha99.png")))
+
+# Long daily lines are thinned to 2000 points (min-max buckets, every exceedance kept).
+# In-process here: this script runs at import time, so pool workers must not re-import it.
+with stage("figures"):
+    render_figures(fig_jobs, n_jobs=1, max_points=2000)
 
 print(f"\nSaved figures to: {fig_dir.resolve()}\n")
 
@@ -90,5 +107,8 @@ for a, tbl in results.items():
                            'display.max_colwidth', None):
         print(tbl.round(4))
 
-
-
+# 7) Where the time went
+log_path = write_log(Path("reports") / "run_log.json", meta={"tickers": tickers, "window": window, "alphas": alpha_levels})
+print(f"\n=== Stage timings (details: {log_path}) ===")
+with pd.option_context('display.max_columns', None, 'display.width', None):
+    print(summary_table(max_depth=1).round(3))
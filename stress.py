@@ -0,0 +1,218 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from varlib.returns import normalize_weight_matrix
+
+
+# Historical replay windows (inclusive dates)
+HISTORICAL_WINDOWS = {
+    "GFC Sep-Nov 2008": ("2008-09-01", "2008-11-30"),
+    "COVID Feb-Mar 2020": ("2020-02-19", "2020-03-23"),
+    "Rates shock 2022": ("2022-08-15", "2022-10-14"),
+}
+
+
+@dataclass(frozen=True)
+class ScenarioSet:
+    """
+    Stress scenarios as one compact matrix, reusable for any number of portfolios.
+    names   = scenario labels, shape (S,)
+    tickers = instruments, shape (N,)
+    shocks  = log-return shock of every instrument in every scenario, shape (S, N), float32
+    """
+    names: np.ndarray
+    tickers: np.ndarray
+    shocks: np.ndarray
+
+    def __len__(self) -> int:
+        return self.shocks.shape[0]
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, names=self.names.astype(str), tickers=self.tickers.astype(str), shocks=self.shocks)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ScenarioSet":
+        with np.load(path, allow_pickle=False) as f:
+            return cls(f["names"], f["tickers"], f["shocks"])
+
+    def concat(self, other: "ScenarioSet") -> "ScenarioSet":
+        """Stack two sets (other is aligned to these tickers, missing = 0 shock)."""
+        pos = {t: i for i, t in enumerate(other.tickers)}
+        shocks = np.zeros((len(other), self.tickers.size), dtype=np.float32)
+        for j, t in enumerate(self.tickers):
+            if t in pos:
+                shocks[:, j] = other.shocks[:, pos[t]]
+        return ScenarioSet(np.concatenate([self.names, other.names]), self.tickers,
+                           np.vstack([self.shocks, shocks]))
+
+
+def _make_set(names: Sequence[str], tickers: Sequence[str], shocks: np.ndarray) -> ScenarioSet:
+    return ScenarioSet(np.asarray(names, dtype=str), np.asarray(tickers, dtype=str),
+                       np.ascontiguousarray(shocks, dtype=np.float32))
+
+
+def historical_scenarios(
+    ret_df: pd.DataFrame,
+    windows: Mapping[str, tuple[str, str]] = HISTORICAL_WINDOWS,
+    mode: str = "cumulative",
+) -> ScenarioSet:
+    """
+    Historical replay: the returns the instruments actually had in each window (2008, March 2020, ...).
+    mode = "cumulative": one scenario per window, the summed log returns over the window
+           "daily":      one scenario per day in the window
+    Windows not covered by ret_df are skipped. Missing returns are 0 (instrument did not move / not listed).
+    """
+    names, rows = [], []
+    for name, (start, end) in windows.items():
+        part = ret_df.loc[start:end].fillna(0.0)
+        if part.empty:
+            continue
+        if mode == "cumulative":
+            names.append(name)
+            rows.append(part.to_numpy().sum(axis=0, keepdims=True))
+        elif mode == "daily":
+            names += [f"{name} {d:%Y-%m-%d}" for d in part.index]
+            rows.append(part.to_numpy())
+        else:
+            raise ValueError("mode must be 'cumulative' or 'daily'.")
+    shocks = np.vstack(rows) if rows else np.empty((0, ret_df.shape[1]))
+    return _make_set(names, ret_df.columns, shocks)
+
+
+def _propagate(ret_df: pd.DataFrame, drivers: Sequence[str], driver_shocks: np.ndarray,
+               window: Optional[int]) -> np.ndarray:
+    """
+    Full shock vectors from shocks on a few drivers: every other instrument moves by its conditional mean
+    E[r_other | r_drivers = s] = s Σ_dd⁻¹ Σ_do (regression on the sample covariance), one matrix product
+    for all scenarios. driver_shocks: (S, k) -> (S, N).
+    """
+    data = ret_df.iloc[-window:] if window else ret_df
+    cov = data.dropna(how="any").cov().to_numpy()
+    cols = list(ret_df.columns)
+    d = [cols.index(t) for t in drivers]
+    beta = np.linalg.lstsq(cov[np.ix_(d, d)], cov[d, :], rcond=None)[0]      # (k, N)
+    shocks = driver_shocks @ beta
+    shocks[:, d] = driver_shocks
+    return shocks
+
+
+def factor_shock_scenarios(
+    ret_df: pd.DataFrame,
+    shocks: Mapping[str, Mapping[str, float]],
+    window: Optional[int] = 250,
+    propagate: bool = True,
+) -> ScenarioSet:
+    """
+    Hypothetical shocks, e.g. {"Tech -20%": {"AAPL": -0.22, "MSFT": -0.22}}  (log-return shocks).
+    propagate=True moves the instruments that are not shocked by their conditional mean
+    (covariance of the last `window` days); False leaves them at 0.
+    """
+    cols = list(ret_df.columns)
+    out = np.zeros((len(shocks), len(cols)))
+    for i, spec in enumerate(shocks.values()):
+        drivers = [t for t in spec if t in cols]
+        s = np.array([[spec[t] for t in drivers]])
+        if propagate and drivers:
+            out[i] = _propagate(ret_df, drivers, s, window)[0]
+        else:
+            out[i, [cols.index(t) for t in drivers]] = s[0]
+    return _make_set(list(shocks.keys()), cols, out)
+
+
+def grid_scenarios(
+    ret_df: pd.DataFrame,
+    levels: Mapping[str, Sequence[float]],
+    window: Optional[int] = 250,
+) -> ScenarioSet:
+    """
+    Full grid of driver shocks: every combination of the given levels, e.g.
+    {"AAPL": np.linspace(-0.3, 0.1, 41), "MSFT": ..., "TSM": ...}  -> 41³ = 68,921 scenarios.
+    Other instruments follow by conditional mean (_propagate), so the whole grid is built with one product.
+    """
+    drivers = list(levels.keys())
+    mesh = np.meshgrid(*[np.asarray(levels[t], dtype=float) for t in drivers], indexing="ij")
+    driver_shocks = np.column_stack([m.ravel() for m in mesh])
+    names = ["grid " + ", ".join(f"{t}={x:+.3f}" for t, x in zip(drivers, row)) for row in driver_shocks]
+    return _make_set(names, ret_df.columns, _propagate(ret_df, drivers, driver_shocks, window))
+
+
+def simulated_scenarios(
+    ret_df: pd.DataFrame,
+    n_scenarios: int = 100_000,
+    horizon: int = 10,
+    vol_multiplier: float = 2.0,
+    corr_to_one: float = 0.0,
+    window: Optional[int] = 250,
+    random_seed: int = 0,
+) -> ScenarioSet:
+    """
+    Large generated set: stressed multivariate normal over `horizon` days,
+    volatility x vol_multiplier and correlations pushed towards 1 by corr_to_one (0 = as estimated, 1 = all 1).
+    """
+    data = (ret_df.iloc[-window:] if window else ret_df).dropna(how="any")
+    sd = data.std(ddof=1).to_numpy()
+    corr = data.corr().to_numpy()
+    corr = (1 - corr_to_one) * corr + corr_to_one * np.ones_like(corr)
+    cov = np.outer(sd, sd) * corr * (vol_multiplier ** 2) * horizon
+    w, V = np.linalg.eigh(cov)
+    L = V * np.sqrt(np.clip(w, 0.0, None))                   # works for the singular corr_to_one = 1 case too
+    rng = np.random.default_rng(random_seed)
+    z = rng.standard_normal((n_scenarios, len(sd)), dtype=np.float32)
+    shocks = z @ L.T.astype(np.float32)
+    return _make_set([f"sim {i}" for i in range(n_scenarios)], ret_df.columns, shocks)
+
+
+def revalue(scenarios: ScenarioSet, weights: Mapping[str, float] | pd.DataFrame) -> pd.Series | pd.DataFrame:
+    """
+    Portfolio P&L as a simple return (fraction of portfolio value) in every scenario, one matrix product:
+    R_p = Σ w_i (exp(s_i) - 1), (S x N) @ (N x P). The shocks are log returns, so each one is turned into the
+    asset's simple return with expm1 before weighting (weights add simple returns, not log returns).
+    Computed in float64 (the stored shocks are float32). weights = one dict, or a P x N DataFrame of portfolios.
+    """
+    single = not isinstance(weights, pd.DataFrame)
+    W = pd.DataFrame([weights], index=["portfolio"]) if single else weights
+    Wn = normalize_weight_matrix(W, pd.Index(scenarios.tickers)).to_numpy(dtype=float)
+    simple = np.expm1(scenarios.shocks, dtype=np.float64)
+    pnl = pd.DataFrame(simple @ Wn.T, index=pd.Index(scenarios.names, name="scenario"), columns=W.index)
+    return pnl["portfolio"] if single else pnl
+
+
+def stress_report(scenarios: ScenarioSet, weights: Mapping[str, float] | pd.DataFrame, top: int = 10) -> pd.DataFrame:
+    """
+    Worst `top` scenarios per portfolio, ranked by loss (loss = -P&L, both simple returns as in revalue).
+    Columns: portfolio, rank, scenario, pnl, loss. np.argpartition keeps it O(S) per portfolio.
+    """
+    pnl = revalue(scenarios, weights)
+    if isinstance(pnl, pd.Series):
+        pnl = pnl.to_frame()
+    vals = pnl.to_numpy()
+    k = min(top, vals.shape[0])
+    rows = []
+    for j, p in enumerate(pnl.columns):
+        worst = np.argpartition(vals[:, j], k - 1)[:k] if k < vals.shape[0] else np.arange(vals.shape[0])
+        worst = worst[np.argsort(vals[worst, j])]
+        for rank, i in enumerate(worst, start=1):
+            rows.append({"portfolio": p, "rank": rank, "scenario": pnl.index[i],
+                         "pnl": float(vals[i, j]), "loss": float(-vals[i, j])})
+    return pd.DataFrame(rows).set_index(["portfolio", "rank"])
+
+
+if __name__ == "__main__":
+    from varlib.data_creator import load_prices, to_log_returns
+
+    tickers = ["AAPL", "MSFT", "AMZN", "TSM", "BA"]
+    weights = {"AAPL": 0.25, "MSFT": 0.25, "AMZN": 0.25, "TSM": 0.15, "BA": 0.10}
+    rets = to_log_returns(load_prices(tickers, start="2007-01-01"))
+
+    scen = historical_scenarios(rets)
+    scen = scen.concat(factor_shock_scenarios(rets, {"Tech -20%": {"AAPL": -0.22, "MSFT": -0.22, "AMZN": -0.22}}))
+    scen = scen.concat(grid_scenarios(rets, {"AAPL": np.linspace(-0.3, 0.1, 21), "BA": np.linspace(-0.5, 0.1, 21)}))
+    scen = scen.concat(simulated_scenarios(rets, n_scenarios=100_000))
+    print(stress_report(scen, weights, top=10))
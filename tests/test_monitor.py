@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from backtests.monitor import rolling_backtest_monitor
+
+
+def _sample(T: int, seed: int = 0) -> tuple[pd.Series, pd.Series]:
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2020-01-01", periods=T)
+    r = pd.Series(rng.standard_normal(T) * 0.01, index=idx)
+    var = pd.Series(0.0233, index=idx)
+    return r, var
+
+
+def test_shorter_than_window_is_all_nan():
+    r, var = _sample(100)
+    out = rolling_backtest_monitor(r, var, 0.99, window=250)
+    assert len(out) == 100
+    assert list(out.columns) == ["T", "exceedances", "hit_rate", "Kupiec_p", "Christ_p", "LRcc_p", "traffic_light"]
+    assert out.drop(columns="traffic_light").isna().all().all()
+    assert out["traffic_light"].isna().all()
+
+
+def test_first_full_window_matches_direct_count():
+    r, var = _sample(400)
+    out = rolling_backtest_monitor(r, var, 0.99, window=250)
+    assert out.iloc[:249].drop(columns="traffic_light").isna().all().all()
+    hits = (-r > var).astype(int)
+    expected = hits.rolling(250).sum()
+    np.testing.assert_array_equal(out["exceedances"].iloc[249:], expected.iloc[249:])
+    assert out["traffic_light"].iloc[249:].isin(["green", "yellow", "red"]).all()
@@ -0,0 +1,22 @@
+import subprocess
+import sys
+
+CODE = """
+import sys
+import numpy as np
+import pandas as pd
+from varlib.plots import render_figures
+
+idx = pd.bdate_range("2020-01-01", periods=50)
+r = pd.Series(np.random.default_rng(0).standard_normal(50) * 0.01, index=idx)
+jobs = [("pnl_vs_var", dict(port_ret=r, var_dict={"HS": pd.Series(0.02, index=idx)}, alpha=0.99))]
+out = render_figures(jobs, data_only=True)
+assert isinstance(out[0], pd.DataFrame)
+print(sorted(m for m in sys.modules if m.split(".")[0] == "matplotlib"))
+"""
+
+
+def test_data_only_render_does_not_import_matplotlib():
+    # fresh interpreter: other tests may already have imported matplotlib here
+    proc = subprocess.run([sys.executable, "-c", CODE], capture_output=True, text=True, check=True)
+    assert proc.stdout.strip() == "[]"
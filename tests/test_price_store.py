@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from varlib.price_store import DirectorySource, PriceStore
+
+DATES = pd.bdate_range("2024-01-01", "2024-03-29")
+
+
+class CountingSource(DirectorySource):
+    """DirectorySource that records every requested range."""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.calls = []
+
+    def fetch(self, tickers, start, end):
+        self.calls.append((tuple(tickers), start, end))
+        return super().fetch(tickers, start, end)
+
+
+def _write_csv(root, ticker: str, prices: pd.Series) -> None:
+    root.mkdir(parents=True, exist_ok=True)
+    prices.rename("Adj Close").rename_axis("Date").to_csv(root / f"{ticker}.csv")
+
+
+def _prices(seed: int) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    return pd.Series(100 * np.exp(np.cumsum(rng.standard_normal(len(DATES)) * 0.01)), index=DATES)
+
+
+def test_incremental_refresh_fetches_only_missing_range(tmp_path):
+    src_dir = tmp_path / "src"
+    _write_csv(src_dir, "AAA", _prices(0))
+    _write_csv(src_dir, "BBB", _prices(1))
+    source = CountingSource(src_dir)
+    store = PriceStore(tmp_path / "store", source)
+
+    first = store.load(["AAA", "BBB"], start="2024-01-01", end="2024-02-29")
+    assert source.calls == [(("AAA", "BBB"), pd.Timestamp("2024-01-01"), pd.Timestamp("2024-02-29"))]
+    assert first.index.max() == pd.Timestamp("2024-02-29")
+
+    source.calls.clear()
+    again = store.load(["AAA", "BBB"], start="2024-01-01", end="2024-02-29")
+    assert source.calls == []
+    pd.testing.assert_frame_equal(first, again)
+
+    full = store.load(["AAA", "BBB"], start="2024-01-01", end="2024-03-29")
+    # one call for the new days, starting at the last stored price date (restatement check)
+    assert source.calls == [(("AAA", "BBB"), pd.Timestamp("2024-02-29"), pd.Timestamp("2024-03-29"))]
+    assert full.index.equals(DATES)
+    np.testing.assert_allclose(full.to_numpy(), np.column_stack([_prices(0), _prices(1)]))
+
+
+def test_bulk_import_from_directory_runs_offline(tmp_path):
+    src_dir = tmp_path / "csv"
+    for i, t in enumerate(["AAA", "BBB", "CCC"]):
+        _write_csv(src_dir, t, _prices(i))
+    store = PriceStore(tmp_path / "store")            # no source: everything must come from the store
+    assert store.import_directory(src_dir) == ["AAA", "BBB", "CCC"]
+
+    out = store.load(["AAA", "CCC"], start="2024-01-01", end="2024-03-29")
+    assert list(out.columns) == ["AAA", "CCC"]
+    np.testing.assert_allclose(out["CCC"].to_numpy(), _prices(2).to_numpy())
+
+
+def test_split_and_dividend_restate_stored_history(tmp_path):
+    src_dir = tmp_path / "src"
+    raw = _prices(3)
+    _write_csv(src_dir, "AAA", raw)
+    store = PriceStore(tmp_path / "store", DirectorySource(src_dir))
+    store.load(["AAA"], start="2024-01-01", end="2024-02-29")
+
+    # 2:1 split on 2024-03-04 and a 2% dividend on 2024-03-18: the source now reports
+    # every earlier adjusted price scaled down, and the post-split prices are halved
+    restated = raw.copy()
+    restated[restated.index >= "2024-03-04"] /= 2.0
+    restated[restated.index < "2024-03-04"] *= 0.5
+    restated[restated.index < "2024-03-18"] *= 0.98
+    _write_csv(src_dir, "AAA", restated)
+
+    out = store.load(["AAA"], start="2024-01-01", end="2024-03-29")["AAA"]
+    np.testing.assert_allclose(out.to_numpy(), restated.to_numpy(), rtol=1e-12)
+    rets = np.log(out / out.shift(1)).dropna()
+    assert rets.abs().max() < 0.1                    # no fake -69% split return at the join
+
+
+def test_older_range_is_restated_onto_stored_basis(tmp_path):
+    src_dir = tmp_path / "src"
+    _write_csv(src_dir, "AAA", _prices(4))
+    store = PriceStore(tmp_path / "store", DirectorySource(src_dir))
+    store.load(["AAA"], start="2024-02-01", end="2024-03-29")
+
+    _write_csv(src_dir, "AAA", _prices(4) * 0.97)     # dividend since: whole history rescaled
+    out = store.load(["AAA"], start="2024-01-01", end="2024-03-29")["AAA"]
+    np.testing.assert_allclose(out.to_numpy(), (_prices(4) * 0.97).to_numpy(), rtol=1e-12)
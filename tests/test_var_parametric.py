@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from varlib.var_horizon import rolling_montecarlo_var_es_horizons
+from varlib.var_parametric import ewma_covariance, rolling_covariance_var_es
+
+WEIGHTS = {"A": 0.5, "B": 0.3, "C": 0.2}
+
+
+def _returns(T: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2020-01-01", periods=T)
+    return pd.DataFrame(rng.standard_normal((T, 3)) * 0.01, index=idx, columns=list("ABC"))
+
+
+def test_ewma_nan_cell_keeps_every_window():
+    rets = _returns(800)
+    rets.iloc[400, 1] = np.nan
+    for source in ("sample", "ewma"):
+        out = rolling_covariance_var_es(rets, WEIGHTS, 0.99, window=250, cov_source=source)
+        assert out["VaR"].notna().sum() == 550, source
+
+
+def test_ewma_mean_counts_missing_as_zero():
+    rets = _returns(400)
+    rets.iloc[100, 0] = np.nan
+    ms = ewma_covariance(rets, window=250)
+    expected = rets.fillna(0.0).rolling(250).mean().to_numpy()
+    np.testing.assert_allclose(ms.mean, expected)
+    assert np.isnan(ms.count[:249]).all()
+    np.testing.assert_array_equal(ms.count[249:], [249] * 101 + [250] * 50)
+
+
+def test_horizons_ewma_first_valid_date_unchanged_by_nan_cell():
+    rets = _returns(400)
+    kwargs = dict(alphas=[0.99], horizons=[1, 5], window=250, n_simulations=500, ewma_lambda=0.94)
+    clean = rolling_montecarlo_var_es_horizons(rets, WEIGHTS, **kwargs)
+    rets.iloc[300, 2] = np.nan
+    gap = rolling_montecarlo_var_es_horizons(rets, WEIGHTS, **kwargs)
+    assert gap.notna().all(axis=1).idxmax() == clean.notna().all(axis=1).idxmax()
+    assert gap.notna().all(axis=1).sum() == clean.notna().all(axis=1).sum()
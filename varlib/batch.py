@@ -0,0 +1,125 @@
+from __future__ import annotations
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from varlib.instrument import instrument
+from varlib.return_matrix import as_frame
+from varlib.returns import normalize_weight_matrix, portfolio_returns_batch
+from varlib.tail import batch_var_es_frame, tail_var_es
+from varlib.var_history import sliding_history_var_es
+from varlib.var_montecarlo import _iter_batched_losses
+from varlib.var_parametric import emwa_vol
+
+BATCH_MODELS = ("hs", "parametric", "parametric_ewma", "montecarlo")
+
+
+def batch_parametric_var_es(
+    port_rets: pd.DataFrame,
+    alphas: Sequence[float] = (0.95, 0.99),
+    window: int = 250,
+    use_ewma: bool = False,
+    ewma_lambda: float = 0.94,
+    lagged: bool = True,
+) -> pd.DataFrame:
+    """
+    rolling_parametric_var_es for every column of port_rets (T x P) at once.
+    Columns MultiIndex (portfolio, alpha, VaR/ES).
+    """
+    from scipy.stats import norm
+    port_rets = as_frame(port_rets)
+    mean = port_rets.rolling(window=window).mean().to_numpy()
+    if use_ewma:
+        sigma = emwa_vol(port_rets, lam=ewma_lambda).to_numpy()
+    else:
+        sigma = port_rets.rolling(window=window).std(ddof=1).to_numpy()
+
+    a = np.asarray(alphas, dtype=float)
+    z = norm.ppf(a)
+    var = -mean[:, :, None] + z * sigma[:, :, None]
+    es = -mean[:, :, None] + sigma[:, :, None] * norm.pdf(z) / (1 - a)
+    out = batch_var_es_frame(port_rets.index, port_rets.columns, list(alphas), var, es)
+    return out.shift(1) if lagged else out
+
+
+def batch_montecarlo_var_es(
+    ret_df: pd.DataFrame,
+    weights_matrix: pd.DataFrame,
+    alphas: Sequence[float] = (0.95, 0.99),
+    window: int = 250,
+    n_simulations: int = 20000,
+    lagged: bool = True,
+    random_seed: int = 42,
+    portfolio_draws: bool = False,
+    missing: str = "drop",
+    max_block_elements: int = 2 ** 24,
+) -> pd.DataFrame:
+    """
+    rolling_montecarlo_var_es_batched for P weight vectors: each day the asset scenarios are simulated once
+    and every portfolio is revalued on those same scenarios (one (P, N) x (N, n_sims) product).
+    For a single row of weights the numbers are the same as rolling_montecarlo_var_es_batched (same seed).
+    Memory: blocks of dates and, for many portfolios, chunks of portfolios within a date are sized so the
+    simulated arrays stay within max_block_elements (see _iter_batched_losses).
+    Columns MultiIndex (portfolio, alpha, VaR/ES).
+    """
+    alphas = list(alphas)
+    Wmat = normalize_weight_matrix(weights_matrix, ret_df.columns).to_numpy()
+    rng = np.random.default_rng(random_seed)
+    T, P = len(ret_df), Wmat.shape[0]
+    var = np.full((T, P, len(alphas)), np.nan)
+    es = np.full((T, P, len(alphas)), np.nan)
+
+    for rows, cols, losses in _iter_batched_losses(ret_df, Wmat, window, n_simulations, rng,
+                                                   max_block_elements=max_block_elements,
+                                                   portfolio_draws=portfolio_draws, missing=missing):
+        var[rows, cols], es[rows, cols] = tail_var_es(losses, alphas, axis=-1)
+
+    out = batch_var_es_frame(ret_df.index, weights_matrix.index, alphas, var, es)
+    return out.shift(1) if lagged else out
+
+
+@instrument
+def batch_var_es(
+    ret_df: pd.DataFrame,
+    weights_matrix: pd.DataFrame,
+    alphas: Sequence[float] = (0.95, 0.99),
+    window: int = 250,
+    models: Sequence[str] = BATCH_MODELS,
+    n_simulations: int = 20000,
+    ewma_lambda: float = 0.94,
+    lagged: bool = True,
+    random_seed: int = 42,
+    portfolio_draws: bool = False,
+    missing: str = "drop",
+) -> dict[str, pd.DataFrame]:
+    """
+    VaR/ES for thousands of portfolios at once.
+    weights_matrix: P x N DataFrame (index = portfolio ids, columns = tickers).
+
+    - portfolio returns for all P: one matrix product (portfolio_returns_batch)
+    - HS: sliding windows of all P series partitioned together (sliding_history_var_es)
+    - parametric (normal / EWMA): rolling moments of the T x P frame
+    - MC: same simulated asset scenarios for every portfolio (batch_montecarlo_var_es);
+      missing="pairwise" calibrates it on pairwise-complete moments
+
+    Returns {model: DataFrame with columns MultiIndex (portfolio, alpha, VaR/ES)}.
+    """
+    unknown = set(models) - set(BATCH_MODELS)
+    if unknown:
+        raise ValueError(f"Unknown models {sorted(unknown)}, choose from {BATCH_MODELS}.")
+    alphas = list(alphas)
+    out = {}
+    if {"hs", "parametric", "parametric_ewma"} & set(models):
+        port_rets = portfolio_returns_batch(ret_df, weights_matrix)
+        if "hs" in models:
+            out["hs"] = sliding_history_var_es(port_rets, alphas, window, lagged)
+        if "parametric" in models:
+            out["parametric"] = batch_parametric_var_es(port_rets, alphas, window, False, ewma_lambda, lagged)
+        if "parametric_ewma" in models:
+            out["parametric_ewma"] = batch_parametric_var_es(port_rets, alphas, window, True, ewma_lambda, lagged)
+    if "montecarlo" in models:
+        out["montecarlo"] = batch_montecarlo_var_es(
+            ret_df, weights_matrix, alphas, window, n_simulations, lagged, random_seed, portfolio_draws, missing
+        )
+    return out
@@ -0,0 +1,185 @@
+"""
+Command-line entry point: selected models x alphas x portfolios from flags and / or a config file.
+
+    python -m varlib.cli --tickers AAPL MSFT --weights AAPL=0.6 MSFT=0.4 --models hs parametric --alphas 0.99
+    python -m varlib.cli --config run.toml --n-jobs 4 --figures
+    python -m varlib.cli --returns data/returns --models montecarlo --no-backtests
+
+Config file (.json or .toml) keys are the DEFAULTS below; command-line flags win over the file.
+Several portfolios: "portfolios" = {name: {ticker: weight}}; "returns" = a saved ReturnMatrix directory
+(no download at all).
+
+Only the standard library is imported up front. numpy / pandas and the models are imported when the run starts,
+yfinance only when prices are downloaded, scipy by the models and backtests that use it and matplotlib only for
+--figures, so --help and small scheduler jobs do not pay for what they do not run
+(python -m benchmarks.bench_imports measures it).
+"""
+from __future__ import annotations
+import argparse
+import json
+from pathlib import Path
+from typing import Optional, Sequence
+
+DEFAULTS: dict = {
+    "tickers": None,                    # None = every ticker with a weight
+    "portfolios": {"portfolio": {"AAPL": 0.25, "MSFT": 0.25, "AMZN": 0.25, "TSM": 0.15, "BA": 0.10}},
+    "start": "2022-01-01",
+    "end": None,
+    "store_dir": "data/prices",
+    "returns": None,                    # saved ReturnMatrix directory instead of prices
+    "models": ["hs", "fhs", "parametric", "parametric_ewma", "montecarlo"],
+    "alphas": [0.95, 0.99],
+    "window": 365,
+    "n_simulations": 20000,
+    "ewma_lambda": 0.94,
+    "n_jobs": 1,
+    "random_seed": 42,
+    "backtests": True,
+    "figures": False,
+    "max_points": 2000,
+    "out": "reports/cli",
+}
+
+
+def load_config(path: Optional[str | Path]) -> dict:
+    """DEFAULTS updated with a .json or .toml file (unknown keys are an error)."""
+    cfg = dict(DEFAULTS)
+    if path is None:
+        return cfg
+    path = Path(path)
+    if path.suffix == ".toml":
+        import tomllib
+        data = tomllib.loads(path.read_text())
+    else:
+        data = json.loads(path.read_text())
+    unknown = set(data) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown config keys {sorted(unknown)}, expected some of {sorted(DEFAULTS)}.")
+    cfg.update(data)
+    return cfg
+
+
+def _parse_weights(pairs: Sequence[str]) -> dict[str, float]:
+    out = {}
+    for p in pairs:
+        ticker, sep, w = p.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"weights are TICKER=WEIGHT, got {p!r}")
+        out[ticker] = float(w)
+    return out
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m varlib.cli", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    # every default is None: unset flags fall back to the config file, then to DEFAULTS
+    parser.add_argument("--config", type=Path, help="JSON or TOML file with any of the DEFAULTS keys")
+    parser.add_argument("--tickers", nargs="+")
+    parser.add_argument("--weights", nargs="+", metavar="TICKER=W", help="one portfolio (replaces 'portfolios')")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--store-dir", dest="store_dir")
+    parser.add_argument("--returns", help="saved ReturnMatrix directory (skips prices / download)")
+    parser.add_argument("--models", nargs="+", help="hs fhs parametric parametric_ewma montecarlo")
+    parser.add_argument("--alphas", nargs="+", type=float)
+    parser.add_argument("--window", type=int)
+    parser.add_argument("--sims", dest="n_simulations", type=int)
+    parser.add_argument("--ewma-lambda", dest="ewma_lambda", type=float)
+    parser.add_argument("--n-jobs", dest="n_jobs", type=int, help="process pool size for models and figures")
+    parser.add_argument("--seed", dest="random_seed", type=int)
+    parser.add_argument("--no-backtests", dest="backtests", action="store_false", default=None)
+    parser.add_argument("--figures", action="store_true", default=None)
+    parser.add_argument("--max-points", dest="max_points", type=int, help="line points per figure (decimation)")
+    parser.add_argument("--out", help="output directory for the CSV files and figures")
+    return parser
+
+
+def resolve_config(args: argparse.Namespace) -> dict:
+    """Config file + flags -> one dict with every DEFAULTS key filled in."""
+    cfg = load_config(args.config)
+    for key, value in vars(args).items():
+        if key in DEFAULTS and value is not None:
+            cfg[key] = value
+    if args.weights:
+        cfg["portfolios"] = {"portfolio": _parse_weights(args.weights)}
+    if not cfg["tickers"]:
+        cfg["tickers"] = sorted({t for w in cfg["portfolios"].values() for t in w})
+    return cfg
+
+
+def _load_returns(cfg: dict):
+    if cfg["returns"]:
+        from varlib.return_matrix import ReturnMatrix
+        return ReturnMatrix.open(cfg["returns"])
+    from varlib.data_creator import load_prices, to_log_returns
+    prices = load_prices(cfg["tickers"], start=cfg["start"], end=cfg["end"], store_dir=cfg["store_dir"])
+    return to_log_returns(prices)
+
+
+def run(cfg: dict) -> dict:
+    """
+    data -> models (orchestrator.run_grid) -> backtests (batch_backtest) -> figures (render_figures), each stage
+    timed with varlib.instrument. Writes var_<model>.csv, backtests.csv and figures to cfg["out"].
+    Returns {"var": {model: frame}, "backtests": frame or None}.
+    """
+    import pandas as pd
+
+    from varlib.instrument import stage
+    from varlib.orchestrator import run_grid
+
+    out = Path(cfg["out"])
+    out.mkdir(parents=True, exist_ok=True)
+    W = pd.DataFrame.from_dict(cfg["portfolios"], orient="index")
+    alphas = [float(a) for a in cfg["alphas"]]
+
+    with stage("data"):
+        rets = _load_returns(cfg)
+
+    with stage("VaR models"):
+        var = run_grid(rets, W, alphas, cfg["window"], cfg["models"], n_jobs=cfg["n_jobs"],
+                       random_seed=cfg["random_seed"], n_simulations=cfg["n_simulations"],
+                       ewma_lambda=cfg["ewma_lambda"])
+    for m, frame in var.items():
+        frame.to_csv(out / f"var_{m}.csv")
+
+    table = None
+    if cfg["backtests"] or cfg["figures"]:
+        from varlib.returns import portfolio_returns_batch
+        port_rets = portfolio_returns_batch(rets, W)
+
+    if cfg["backtests"]:
+        from backtests.batch import batch_backtest
+
+        with stage("backtests"):
+            # one VaR column per (model, portfolio, alpha), each against its portfolio's returns
+            cols = [(m, p, a) for m in var for p in W.index for a in alphas]
+            var_matrix = pd.concat([var[m][(p, a, "VaR")] for m, p, a in cols], axis=1,
+                                   keys=pd.MultiIndex.from_tuples(cols, names=["model", "portfolio", "alpha"]))
+            table = batch_backtest(port_rets[[p for _, p, _ in cols]], var_matrix, [a for *_, a in cols])
+        table.to_csv(out / "backtests.csv")
+
+    if cfg["figures"]:
+        from varlib.plots import render_figures
+
+        with stage("figures"):
+            jobs = [("pnl_vs_var", dict(port_ret=port_rets[p], var_dict={m: var[m][(p, a, "VaR")] for m in var},
+                                        alpha=a, highlight=next(iter(var)),
+                                        savepath=out / "figs" / f"pnl_vs_var_{p}_alpha{a * 100:g}.png"))
+                    for p in W.index for a in alphas]
+            render_figures(jobs, n_jobs=cfg["n_jobs"], max_points=cfg["max_points"])
+
+    return {"var": var, "backtests": table}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    cfg = resolve_config(build_parser().parse_args(argv))
+    result = run(cfg)
+    print(f"VaR / ES for {', '.join(result['var'])} written to {Path(cfg['out']).resolve()}")
+    if result["backtests"] is not None:
+        import pandas as pd
+        with pd.option_context("display.max_columns", None, "display.width", None):
+            print(result["backtests"].round(4))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,11 @@ from __future__ import annotations
 import pandas as pd
 import numpy as np
 from typing import Sequence, Optional
-import yfinance as yf
 
+from varlib.instrument import instrument
 
+
+@instrument
 def load_prices_yf(tickers: Sequence[str], start: str = "2005-01-01", end: Optional[str] = None) -> pd.DataFrame:
     """
     Tickers are liquid instruments
@@ -16,11 +18,31 @@ def load_prices_yf(tickers: Sequence[str], start: str = "2005-01-01", end: Optio
 
     returns DataFrame (Date index, columns=instruments).
     """
+    import yfinance as yf
     data = yf.download(list(tickers), start=start, end=end, auto_adjust=False, progress=False)["Adj Close"]
     if isinstance(data, pd.Series):
         data = data.to_frame()
     return data.dropna(how="all").sort_index()
 
+@instrument
+def load_prices(
+    tickers: Sequence[str],
+    start: str = "2005-01-01",
+    end: Optional[str] = None,
+    store_dir: str = "data/prices",
+    source=None,
+) -> pd.DataFrame:
+    """
+    Same output as load_prices_yf, but through the local price store (varlib.price_store):
+    only date ranges that are not stored yet are fetched from `source` (Yahoo by default),
+    everything else is read from disk, so repeated runs are fast and can run offline.
+    source = any PriceSource, e.g. DirectorySource("some/csv/dir") for no network at all.
+    """
+    from varlib.price_store import PriceStore, YahooSource
+    return PriceStore(store_dir, source if source is not None else YahooSource()).load(tickers, start, end)
+
+
+@instrument
 def to_log_returns(prices: pd.DataFrame) -> pd.DataFrame:
     """
     prices.shift(1) moves all prices 1 row down (compares Pt with Pt-1)
@@ -0,0 +1,304 @@
+"""
+Daily-update mode: every model keeps a small rolling state (window buffer, running sums, EWMA variance,
+Cholesky factor, RNG position) that can be saved to disk and moved one day forward with one new row of returns,
+without touching history.
+
+Every init_*/update_state call returns (state, forecast), forecast = DataFrame index=alpha, columns VaR/ES:
+the estimate from the window that ends at the last row seen, i.e. the VaR/ES for the NEXT day.
+It is the same number a full recompute gives from that window:
+- HS / parametric: row of the last date in the lagged=False output (the lagged=True output one row later),
+- MC: the full-run value one row after the last date with lagged=False (MC shifts its window by one day itself).
+"""
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from varlib.tail import tail_var_es
+from varlib.var_montecarlo import _iter_batched_losses, _weight_vector
+
+
+def _forecast_frame(alphas: Sequence[float], var: np.ndarray, es: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame({"VaR": var, "ES": es}, index=pd.Index(list(alphas), name="alpha"))
+
+
+# ---------- HS ----------
+
+def init_history_state(
+    portfolio_returns: pd.Series,
+    window: int = 250,
+    alphas: Sequence[float] = (0.95, 0.99),
+) -> tuple[dict, pd.DataFrame]:
+    """State = ring buffer with the last `window` losses."""
+    if len(portfolio_returns) < window:
+        raise ValueError("Not enough data to fill the HS window.")
+    state = {
+        "model": "hs",
+        "window": window,
+        "alphas": np.asarray(alphas, dtype=float),
+        "buffer": -portfolio_returns.to_numpy(dtype=float)[-window:].copy(),
+        "pos": 0,                                   # oldest element
+        "last_date": str(portfolio_returns.index[-1]),
+    }
+    return state, _history_forecast(state)
+
+
+def _history_forecast(state: dict) -> pd.DataFrame:
+    var, es = tail_var_es(state["buffer"], state["alphas"])
+    return _forecast_frame(state["alphas"], var, es)
+
+
+def _history_update(state: dict, r: float) -> None:
+    state["buffer"][state["pos"]] = -r
+    state["pos"] = (state["pos"] + 1) % state["window"]
+
+
+# ---------- parametric (normal / EWMA) ----------
+
+def init_parametric_state(
+    portfolio_returns: pd.Series,
+    window: int = 250,
+    alphas: Sequence[float] = (0.95, 0.99),
+    use_ewma: bool = False,
+    ewma_lambda: float = 0.94,
+    refresh_every: int = 250,
+) -> tuple[dict, pd.DataFrame]:
+    """
+    State = window buffer + running Σr and Σr² (rolling mean / std), and the EWMA variance σ²_t
+    (σ²_t = λσ²_{t-1} + (1-λ) r_t², same recursion as emwa_vol).
+    Running sums are recomputed from the buffer every `refresh_every` updates so rounding cannot drift.
+    """
+    if len(portfolio_returns) < window:
+        raise ValueError("Not enough data to fill the parametric window.")
+    r = portfolio_returns.to_numpy(dtype=float)
+    ewma_var = float(portfolio_returns.pow(2).ewm(alpha=1 - ewma_lambda, adjust=False).mean().iloc[-1])
+    buf = r[-window:].copy()
+    state = {
+        "model": "parametric",
+        "window": window,
+        "alphas": np.asarray(alphas, dtype=float),
+        "use_ewma": use_ewma,
+        "ewma_lambda": ewma_lambda,
+        "ewma_var": ewma_var,
+        "buffer": buf,
+        "pos": 0,
+        "s1": buf.sum(),
+        "s2": (buf * buf).sum(),
+        "refresh_every": refresh_every,
+        "since_refresh": 0,
+        "last_date": str(portfolio_returns.index[-1]),
+    }
+    return state, _parametric_forecast(state)
+
+
+def _parametric_forecast(state: dict) -> pd.DataFrame:
+    from scipy.stats import norm
+    n = state["window"]
+    mean = state["s1"] / n
+    if state["use_ewma"]:
+        sigma = np.sqrt(state["ewma_var"])
+    else:
+        sigma = np.sqrt(max(state["s2"] - n * mean * mean, 0.0) / (n - 1))
+    a = state["alphas"]
+    z = norm.ppf(a)
+    return _forecast_frame(a, -mean + z * sigma, -mean + sigma * norm.pdf(z) / (1 - a))
+
+
+def _parametric_update(state: dict, r: float) -> None:
+    old = state["buffer"][state["pos"]]
+    state["buffer"][state["pos"]] = r
+    state["pos"] = (state["pos"] + 1) % state["window"]
+    state["s1"] += r - old
+    state["s2"] += r * r - old * old
+    lam = state["ewma_lambda"]
+    state["ewma_var"] = lam * state["ewma_var"] + (1 - lam) * r * r
+    state["since_refresh"] += 1
+    if state["since_refresh"] >= state["refresh_every"]:
+        state["s1"] = state["buffer"].sum()
+        state["s2"] = (state["buffer"] ** 2).sum()
+        state["since_refresh"] = 0
+
+
+# ---------- Monte Carlo ----------
+
+def _chol_rank_one(L: np.ndarray, x: np.ndarray, sign: float) -> bool:
+    """
+    In-place rank-one update (sign=+1) or downdate (sign=-1) of a lower Cholesky factor:
+    L Lᵀ ± x xᵀ. O(N²). Returns False if the downdate loses positive definiteness.
+    """
+    x = x.copy()
+    for k in range(L.shape[0]):
+        r2 = L[k, k] ** 2 + sign * x[k] ** 2
+        if r2 <= 0 or L[k, k] == 0:
+            return False
+        r = np.sqrt(r2)
+        c, s = r / L[k, k], x[k] / L[k, k]
+        L[k, k] = r
+        L[k + 1:, k] = (L[k + 1:, k] + sign * s * x[k + 1:]) / c
+        x[k + 1:] = c * x[k + 1:] - s * L[k + 1:, k]
+    return True
+
+
+def _mc_refresh(state: dict) -> None:
+    """Recompute count, mean and the scatter-matrix Cholesky factor from the window buffer (O(wN² + N³))."""
+    buf = state["buffer"][state["valid"]]
+    n = buf.shape[0]
+    state["count"] = n
+    state["jittered"] = False
+    state["since_refresh"] = 0
+    if n < 2:
+        state["mean"] = np.full(buf.shape[1], np.nan)
+        state["chol"] = np.full((buf.shape[1],) * 2, np.nan)
+        return
+    state["mean"] = buf.mean(axis=0)
+    cov = np.cov(buf.T, ddof=1).reshape(buf.shape[1], buf.shape[1])
+    try:
+        L = np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        # same fallback as the MC models; a jittered factor is not updated, it is rebuilt next day
+        L = np.linalg.cholesky(cov + 1e-8 * np.eye(cov.shape[0]))
+        state["jittered"] = True
+    state["chol"] = L * np.sqrt(n - 1)          # factor of the scatter matrix M = (n-1)Σ
+
+
+def init_montecarlo_state(
+    return_dataframe: pd.DataFrame,
+    weights: dict[str, float],
+    window: int = 250,
+    alphas: Sequence[float] = (0.95, 0.99),
+    n_simulations: int = 20000,
+    random_seed: int = 42,
+    replay: bool = True,
+    refresh_every: int = 250,
+) -> tuple[dict, pd.DataFrame]:
+    """
+    State = asset window buffer (rows with a NaN are kept but flagged, like dropna per window),
+    count, mean, Cholesky factor of the window scatter matrix, and the RNG position.
+
+    replay=True moves the RNG exactly as a full rolling_montecarlo_var_es_batched run over this history would
+    (same seed), so the daily forecasts continue the same random stream as a full recompute.
+    That costs one full run, once; replay=False starts a fresh stream.
+    """
+    if len(return_dataframe) < window:
+        raise ValueError("Not enough data to fill the MC window.")
+    rng = np.random.default_rng(random_seed)
+    W = _weight_vector(list(return_dataframe.columns), weights)
+    if replay:
+        for _ in _iter_batched_losses(return_dataframe, W[None, :], window, n_simulations, rng):
+            pass
+    X = return_dataframe.to_numpy(dtype=float)[-window:].copy()
+    state = {
+        "model": "montecarlo",
+        "window": window,
+        "alphas": np.asarray(alphas, dtype=float),
+        "n_simulations": n_simulations,
+        "columns": np.asarray(return_dataframe.columns, dtype=str),
+        "weights": W,
+        "buffer": X,
+        "valid": ~np.isnan(X).any(axis=1),
+        "pos": 0,
+        "refresh_every": refresh_every,
+        "rng_state": json.dumps(rng.bit_generator.state),
+        "last_date": str(return_dataframe.index[-1]),
+    }
+    _mc_refresh(state)
+    return state, _montecarlo_forecast(state)
+
+
+def _montecarlo_forecast(state: dict) -> pd.DataFrame:
+    a = state["alphas"]
+    if state["count"] < 2:
+        return _forecast_frame(a, np.full(a.size, np.nan), np.full(a.size, np.nan))
+    rng = np.random.default_rng()
+    rng.bit_generator.state = json.loads(state["rng_state"])
+    W = state["weights"]
+    L = state["chol"] / np.sqrt(state["count"] - 1)
+    z = rng.standard_normal((W.size, state["n_simulations"]))
+    losses = -(state["mean"] @ W + (L.T @ W) @ z)
+    state["rng_state"] = json.dumps(rng.bit_generator.state)
+    var, es = tail_var_es(losses, a)
+    return _forecast_frame(a, var, es)
+
+
+def _montecarlo_update(state: dict, x: np.ndarray) -> None:
+    """
+    Add the new row, drop the oldest one. With fixed mean μ and scatter M:
+    add x:    M += n/(n+1) (x-μ)(x-μ)ᵀ,  μ += (x-μ)/(n+1)   -> rank-one update
+    drop y:   M -= n/(n-1) (y-μ)(y-μ)ᵀ,  μ -= (y-μ)/(n-1)   -> rank-one downdate
+    O(N²) per day; falls back to a rebuild from the buffer when the factor is jittered, the window gets
+    too short, a downdate fails, or every refresh_every days.
+    """
+    pos = state["pos"]
+    y, y_valid = state["buffer"][pos].copy(), state["valid"][pos]
+    x_valid = not np.isnan(x).any()
+    state["buffer"][pos] = x
+    state["valid"][pos] = x_valid
+    state["pos"] = (pos + 1) % state["window"]
+    state["since_refresh"] += 1
+
+    n = state["count"]
+    ok = not state["jittered"] and n >= 2 and state["since_refresh"] < state["refresh_every"]
+    L, mu = state["chol"].copy(), state["mean"].copy()
+    if ok and x_valid:
+        d = x - mu
+        ok = _chol_rank_one(L, np.sqrt(n / (n + 1)) * d, +1.0)
+        mu += d / (n + 1)
+        n += 1
+    if ok and y_valid:
+        ok = n - 1 >= 2
+        if ok:
+            d = y - mu
+            ok = _chol_rank_one(L, np.sqrt(n / (n - 1)) * d, -1.0)
+            mu -= d / (n - 1)
+            n -= 1
+    if ok:
+        state["chol"], state["mean"], state["count"] = L, mu, n
+    else:
+        _mc_refresh(state)
+
+
+# ---------- common ----------
+
+def update_state(state: dict, new_returns: float | pd.Series | np.ndarray, date=None) -> tuple[dict, pd.DataFrame]:
+    """
+    Move a model state one day forward with one new row of returns and give the next-day VaR/ES.
+    HS / parametric take the new portfolio return (float); MC takes the new asset return row
+    (Series indexed by ticker, or array in the state's column order).
+    """
+    model = state["model"]
+    if model == "hs":
+        _history_update(state, float(new_returns))
+        forecast = _history_forecast(state)
+    elif model == "parametric":
+        _parametric_update(state, float(new_returns))
+        forecast = _parametric_forecast(state)
+    elif model == "montecarlo":
+        if isinstance(new_returns, pd.Series):
+            new_returns = new_returns.reindex(state["columns"])
+        _montecarlo_update(state, np.asarray(new_returns, dtype=float))
+        forecast = _montecarlo_forecast(state)
+    else:
+        raise ValueError(f"Unknown model state {model!r}.")
+    if date is not None:
+        state["last_date"] = str(date)
+    return state, forecast
+
+
+def save_state(state: dict, path: str | Path) -> None:
+    """Write a model state to one .npz file (arrays stored as they are, no pickling)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(path, **{k: np.asarray(v) for k, v in state.items()})
+
+
+def load_state(path: str | Path) -> dict:
+    """Read a state written by save_state."""
+    with np.load(path, allow_pickle=False) as data:
+        state = {k: data[k] for k in data.files}
+    for k, v in state.items():
+        if v.ndim == 0:
+            state[k] = v.item()
+    return state
@@ -0,0 +1,202 @@
+"""
+Stage-level instrumentation: wall time, CPU time, peak memory and counts per stage / model call.
+
+    with stage("data download", tickers=5) as st:
+        prices = ...
+        st["rows"] = len(prices)
+
+    @instrument("hs")                # or plain @instrument -> function name
+    def history_var_expected_loss(...): ...
+
+    add_counts(paths=n_sims * n_dates)    # adds counts to the innermost open stage
+
+Stages nest (a model call inside "4) VaR models" is recorded as "4) VaR models/hs").
+Off by default (no overhead beyond one flag check); switched on by configure(enabled=True) or the environment:
+
+    VARLIB_INSTRUMENT=1          record stages
+    VARLIB_TRACE_MEMORY=0        skip tracemalloc (peak_mb is then not recorded)
+    VARLIB_PROFILE=1             cProfile every outermost profiled stage, or a comma-separated list of stage names
+    VARLIB_PROFILE_DIR=<dir>     where .prof files go (default reports/profiles; read with pstats / snakeviz)
+
+write_log(path) dumps all records as JSON, summary_table() aggregates them per stage.
+"""
+from __future__ import annotations
+import cProfile
+import functools
+import inspect
+import json
+import os
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+import pandas as pd
+
+_CONFIG = {
+    "enabled": os.environ.get("VARLIB_INSTRUMENT", "0") not in ("", "0"),
+    "memory": os.environ.get("VARLIB_TRACE_MEMORY", "1") not in ("", "0"),
+    "profile": os.environ.get("VARLIB_PROFILE", ""),
+    "profile_dir": os.environ.get("VARLIB_PROFILE_DIR", "reports/profiles"),
+}
+RECORDS: list[dict] = []
+_STACK: list[dict] = []
+_STATE = {"tracemalloc_owner": False, "profiler": None}
+
+
+def configure(enabled: Optional[bool] = None, memory: Optional[bool] = None,
+              profile: Optional[str] = None, profile_dir: Optional[str] = None) -> None:
+    """Override the environment defaults (profile: "1" = all stages, or "name1,name2")."""
+    for key, val in (("enabled", enabled), ("memory", memory), ("profile", profile), ("profile_dir", profile_dir)):
+        if val is not None:
+            _CONFIG[key] = val
+
+
+def reset() -> None:
+    RECORDS.clear()
+
+
+def _wants_profile(name: str) -> bool:
+    p = str(_CONFIG["profile"])
+    if p in ("", "0") or _STATE["profiler"] is not None:     # one profiler at a time (outermost wins)
+        return False
+    return p == "1" or name in [s.strip() for s in p.split(",")]
+
+
+@contextmanager
+def stage(name: str, **counts) -> Iterator[dict]:
+    """
+    Record one stage. Yields the record (a dict), so counts known only inside can be added: st["rows"] = n.
+    Peak memory = tracemalloc high-water mark above the memory in use when the stage started (MB).
+    """
+    if not _CONFIG["enabled"]:
+        yield dict(counts)
+        return
+
+    parent = _STACK[-1] if _STACK else None
+    rec = {
+        "stage": name,
+        "path": f"{parent['path']}/{name}" if parent else name,
+        "depth": len(_STACK),
+        "started": datetime.now(timezone.utc).isoformat(),
+        **counts,
+    }
+
+    if _CONFIG["memory"]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _STATE["tracemalloc_owner"] = True
+        current, peak = tracemalloc.get_traced_memory()
+        if parent is not None:
+            parent["_peak"] = max(parent.get("_peak", 0), peak)
+        tracemalloc.reset_peak()
+        rec["_base"] = current
+
+    prof = None
+    if _wants_profile(name):
+        prof = cProfile.Profile()
+        _STATE["profiler"] = prof
+        prof.enable()
+
+    _STACK.append(rec)
+    w0, c0 = time.perf_counter(), time.process_time()
+    try:
+        yield rec
+    except BaseException as exc:
+        rec["error"] = type(exc).__name__
+        raise
+    finally:
+        rec["wall_s"] = time.perf_counter() - w0
+        rec["cpu_s"] = time.process_time() - c0
+        _STACK.pop()
+        if prof is not None:
+            prof.disable()
+            _STATE["profiler"] = None
+            out = Path(_CONFIG["profile_dir"])
+            out.mkdir(parents=True, exist_ok=True)
+            fname = out / (re.sub(r"[^\w.-]+", "_", rec["path"]) + ".prof")
+            prof.dump_stats(fname)
+            rec["profile"] = str(fname)
+        if "_base" in rec:
+            peak = max(rec.pop("_peak", 0), tracemalloc.get_traced_memory()[1])
+            rec["peak_mb"] = max(peak - rec.pop("_base"), 0) / 2 ** 20
+            if parent is not None:
+                parent["_peak"] = max(parent.get("_peak", 0), peak)
+            elif _STATE["tracemalloc_owner"]:
+                tracemalloc.stop()
+                _STATE["tracemalloc_owner"] = False
+        RECORDS.append(rec)
+
+
+def add_counts(**counts) -> None:
+    """Add (sum) counts such as rows=..., paths=... to the innermost open stage; no-op when off."""
+    if _CONFIG["enabled"] and _STACK:
+        rec = _STACK[-1]
+        for k, v in counts.items():
+            rec[k] = rec.get(k, 0) + v
+
+
+def _auto_counts(sig: inspect.Signature, args: tuple, kwargs: dict) -> dict:
+    """rows = length of the first pandas argument; n_simulations if the call has one (positional or keyword)."""
+    try:
+        bound = sig.bind_partial(*args, **kwargs).arguments
+    except TypeError:
+        return {}
+    out = {}
+    for a in bound.values():
+        if isinstance(a, (pd.Series, pd.DataFrame)):
+            out["rows"] = len(a)
+            break
+    for k in ("n_simulations", "n_sims"):
+        if k in bound:
+            out["n_simulations"] = bound[k]
+    return out
+
+
+def instrument(name: Optional[str | Callable] = None) -> Callable:
+    """Decorator form of stage(): @instrument or @instrument("label"). Rows / n_simulations are picked up from the call."""
+    def deco(fn: Callable) -> Callable:
+        label = name if isinstance(name, str) else fn.__name__
+        sig = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _CONFIG["enabled"]:
+                return fn(*args, **kwargs)
+            with stage(label, **_auto_counts(sig, args, kwargs)):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return deco(name) if callable(name) else deco
+
+
+def write_log(path: str | Path, meta: Optional[dict] = None) -> Path:
+    """All records (in completion order) as JSON: {"meta": {...}, "stages": [...]}."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"meta": meta or {}, "stages": RECORDS}, indent=2, default=str))
+    return path
+
+
+def summary_table(max_depth: Optional[int] = None) -> pd.DataFrame:
+    """
+    One row per stage path, in first-seen order: calls, total wall / CPU seconds, max peak MB and summed counts.
+    max_depth=0 keeps only the top-level stages.
+    """
+    if not RECORDS:
+        return pd.DataFrame()
+    df = pd.DataFrame(RECORDS)
+    if max_depth is not None:
+        df = df[df["depth"] <= max_depth]
+    agg = {"stage": "size", "wall_s": "sum", "cpu_s": "sum"}
+    if "peak_mb" in df:
+        agg["peak_mb"] = "max"
+    for c in ("rows", "n_simulations", "paths"):
+        if c in df:
+            agg[c] = lambda x: x.sum(min_count=1)
+    order = pd.unique(df.sort_values("started")["path"])
+    out = df.groupby("path", sort=False).agg(agg).rename(columns={"stage": "calls"})
+    return out.loc[order]
@@ -0,0 +1,270 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from varlib.return_matrix import ReturnMatrix
+
+_CHUNK_ROWS = 4096
+
+
+@dataclass(frozen=True)
+class MomentSeries:
+    """
+    Rolling first and second moments for every date, stored as plain arrays.
+    index   = dates (T)
+    columns = instruments (N)
+    count   = number of rows used in each window, shape (T,)
+    mean    = μ_t, shape (T, N)
+    cov     = Σ_t, shape (T, N, N)
+    Entry t describes the window [t-window+1, t] (same convention as pandas .rolling()).
+    Dates without enough data are NaN.
+    """
+    index: pd.Index
+    columns: pd.Index
+    count: np.ndarray
+    mean: np.ndarray
+    cov: np.ndarray
+
+
+def _raw_values(returns: pd.DataFrame | ReturnMatrix) -> np.ndarray:
+    """The (T, N) array behind a frame or ReturnMatrix, without converting it (may be float32 / memory-mapped)."""
+    if isinstance(returns, ReturnMatrix):
+        return returns.values
+    return returns.to_numpy(dtype=np.float64, copy=False)
+
+
+def _row_mask_and_center(X: np.ndarray, complete_rows: bool) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Chunked pass over X: availability mask (complete rows (T,) or cells (T, N)) and the centering mean
+    (over complete rows, or per column over its observations).
+    """
+    T, N = X.shape
+    mask = np.empty(T if complete_rows else (T, N), dtype=bool)
+    s, n = np.zeros(N), np.zeros(N)
+    for a in range(0, T, _CHUNK_ROWS):
+        x = X[a:a + _CHUNK_ROWS].astype(np.float64)
+        ok = ~np.isnan(x)
+        if complete_rows:
+            ok = np.broadcast_to(ok.all(axis=1)[:, None], ok.shape)
+            mask[a:a + _CHUNK_ROWS] = ok[:, 0]
+        else:
+            mask[a:a + _CHUNK_ROWS] = ok
+        s += np.where(ok, x, 0.0).sum(axis=0)
+        n += ok.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        center = np.where(n > 0, s / np.maximum(n, 1), 0.0)
+    return mask, center
+
+
+def iter_rolling_moments(
+    return_dataframe: pd.DataFrame | ReturnMatrix,
+    window: int,
+    block_size: int = 64,
+    min_count: int = 2,
+    dtype=np.float64,
+    missing: str = "drop",
+    psd_repair: bool = True,
+) -> Iterator[tuple[slice, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Rolling mean / covariance over complete rows, yielded in blocks of dates.
+    A row with ANY NaN is left out of the window, exactly like .dropna(how="any") per window.
+    missing="pairwise" uses every available observation instead (iter_rolling_moments_pairwise,
+    with psd_repair); "drop" is the default.
+
+    Instead of recomputing mean() and np.cov for every window:
+    - the first date of a block is computed directly from its window (X'X),
+    - every next date adds the new row and drops the old one (rank-one add/drop: x_t x_tᵀ - x_{t-w} x_{t-w}ᵀ),
+      and the block is done with one cumulative sum.
+    Each block restarts from an exact window sum, so rounding does not accumulate over the whole history.
+    Data is centered by the full-sample mean first (covariance is shift invariant, cancellation is smaller).
+    Only the rows of the current block (+ one window) are converted to float64, so a float32 / memory-mapped
+    ReturnMatrix is never copied as a whole.
+
+    Yields (slice of dates, count (B,), mean (B, N), cov (B, N, N)).
+    Dates with t < window-1 or count < min_count are NaN.
+    """
+    if missing == "pairwise":
+        yield from iter_rolling_moments_pairwise(return_dataframe, window, block_size, min_count, dtype, psd_repair)
+        return
+    if missing != "drop":
+        raise ValueError(f"missing must be 'drop' or 'pairwise', got {missing!r}.")
+    X = _raw_values(return_dataframe)
+    T, N = X.shape
+    complete, center = _row_mask_and_center(X, complete_rows=True)
+
+    # number of complete rows in [t-window+1, t]
+    csum = np.concatenate([[0], np.cumsum(complete)])
+    ends = np.arange(T)
+    counts = (csum[ends + 1] - csum[np.maximum(ends + 1 - window, 0)]).astype(float)
+    counts[ends < window - 1] = np.nan
+
+    for a in range(0, T, block_size):
+        b = min(a + block_size, T)
+        B = b - a
+        mean = np.full((B, N), np.nan, dtype=dtype)
+        cov = np.full((B, N, N), np.nan, dtype=dtype)
+        start = max(a, window - 1)
+        if start < b:
+            lo = start - window + 1
+            # centered rows of every window ending in [start, b), incomplete rows = 0
+            Xc = np.where(complete[lo:b, None], X[lo:b].astype(np.float64) - center, 0.0)
+            S1 = Xc[:window].sum(axis=0)
+            S2 = Xc[:window].T @ Xc[:window]
+
+            new = Xc[window:]
+            old = Xc[:b - lo - window]
+            d1 = new - old
+            d2 = new[:, :, None] * new[:, None, :] - old[:, :, None] * old[:, None, :]
+            S1 = np.concatenate([S1[None], S1 + np.cumsum(d1, axis=0)])
+            S2 = np.concatenate([S2[None], S2 + np.cumsum(d2, axis=0)])
+
+            n = counts[start:b]
+            ok = n >= min_count
+            n_ok = n[ok][:, None]
+            m = S1[ok] / n_ok
+            c = (S2[ok] - n_ok[:, :, None] * m[:, :, None] * m[:, None, :]) / (n_ok[:, :, None] - 1)
+            rows = np.flatnonzero(ok) + (start - a)
+            mean[rows] = m + center
+            cov[rows] = c
+        yield slice(a, b), counts[a:b], mean, cov
+
+
+def _window_cross_sums(a: np.ndarray, b: np.ndarray, window: int) -> np.ndarray:
+    """
+    Σ a_i b_j over every `window` consecutive rows, shape (len(a) - window + 1, N, N):
+    the first window with one matrix product (aᵀb), then only the new and the dropped row per date
+    (rank-one add/drop, one cumulative sum), so the work is O(window·N² + B·N²), not O((B + window)·N²).
+    """
+    out = np.empty((len(a) - window + 1, a.shape[1], b.shape[1]))
+    out[0] = a[:window].T @ b[:window]
+    diff = out[1:]
+    np.multiply(a[window:, :, None], b[window:, None, :], out=diff)
+    diff -= a[:len(a) - window, :, None] * b[:len(b) - window, None, :]
+    np.cumsum(diff, axis=0, out=diff)
+    diff += out[0]
+    return out
+
+
+def iter_rolling_moments_pairwise(
+    return_dataframe: pd.DataFrame | ReturnMatrix,
+    window: int,
+    block_size: int = 64,
+    min_count: int = 2,
+    dtype=np.float64,
+    psd_repair: bool = True,
+) -> Iterator[tuple[slice, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Rolling moments from pairwise-complete observations (like DataFrame.cov() per window, not dropna(how="any")):
+    a newly listed ticker or a holiday in one market only removes that asset's missing days, not whole rows.
+
+    With m = availability mask and x = centered returns (0 where missing), three masked cumulative sums per pair:
+    n_ij = Σ m_i m_j,  S_i|j = Σ x_i m_j,  S_ij = Σ x_i x_j
+    cov_ij = (S_ij - S_i|j S_j|i / n_ij) / (n_ij - 1),   μ_i = S_i|i / n_ii   (each asset's own observations)
+    Blocks of dates are done as in iter_rolling_moments: the first date's sums are matrix products (mᵀm, xᵀm, xᵀx),
+    every next date adds its new row and drops the expired one, so a block costs O(window·N² + B·N²) and only
+    (B, N, N) arrays are held.
+
+    Pairwise matrices need not be PSD; psd_repair=True replaces those by the nearest PSD matrix (nearest_psd).
+    count = smallest pair count n_ij in the window; pairs with fewer than min_count observations make the date NaN.
+    Yields (slice of dates, count (B,), mean (B, N), cov (B, N, N)).
+    """
+    X = _raw_values(return_dataframe)
+    T, N = X.shape
+    avail, center = _row_mask_and_center(X, complete_rows=False)
+
+    for a in range(0, T, block_size):
+        b = min(a + block_size, T)
+        B = b - a
+        count = np.full(B, np.nan)
+        mean = np.full((B, N), np.nan, dtype=dtype)
+        cov = np.full((B, N, N), np.nan, dtype=dtype)
+        start = max(a, window - 1)
+        if start < b:
+            # rows of every window ending in [start, b)
+            lo = start - window + 1
+            m = avail[lo:b].astype(np.float64)
+            x = np.where(avail[lo:b], X[lo:b].astype(np.float64) - center, 0.0)
+            n = _window_cross_sums(m, m, window)
+            Sx = _window_cross_sums(x, m, window)
+            Sxx = _window_cross_sums(x, x, window)
+
+            nmin = n.min(axis=(1, 2))
+            ok = nmin >= min_count
+            rows = np.flatnonzero(ok) + (start - a)
+            count[start - a:] = nmin
+            if ok.any():
+                n_ok, Sx_ok = n[ok], Sx[ok]
+                c = (Sxx[ok] - Sx_ok * np.swapaxes(Sx_ok, 1, 2) / n_ok) / (n_ok - 1)
+                if psd_repair:
+                    c = nearest_psd(c)
+                mean[rows] = np.diagonal(Sx_ok, axis1=1, axis2=2) / np.diagonal(n_ok, axis1=1, axis2=2) + center
+                cov[rows] = c
+        yield slice(a, b), count, mean, cov
+
+
+def nearest_psd(cov: np.ndarray, eps: float = 0.0) -> np.ndarray:
+    """
+    Nearest positive semi-definite matrices for a stack (B, N, N) (symmetric input), batched:
+    negative eigenvalues are clipped to eps (one batched eigh), then rows/columns are rescaled so the
+    variances on the diagonal are the original ones. Matrices that are already PSD are returned unchanged.
+    """
+    out = np.array(cov, dtype=np.float64, copy=True)
+    w, V = np.linalg.eigh(out)
+    bad = w[:, 0] < 0
+    if bad.any():
+        Vb = V[bad]
+        fixed = (Vb * np.clip(w[bad], eps, None)[:, None, :]) @ np.swapaxes(Vb, 1, 2)
+        d_old = np.diagonal(out[bad], axis1=1, axis2=2)
+        d_new = np.diagonal(fixed, axis1=1, axis2=2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            s = np.where(d_new > 0, np.sqrt(d_old / d_new), 0.0)
+        out[bad] = fixed * s[:, :, None] * s[:, None, :]
+    return out.astype(cov.dtype, copy=False)
+
+
+def rolling_moments(
+    return_dataframe: pd.DataFrame | ReturnMatrix,
+    window: int,
+    block_size: int = 64,
+    min_count: int = 2,
+    dtype=np.float64,
+    missing: str = "drop",
+    psd_repair: bool = True,
+) -> MomentSeries:
+    """
+    Full (T, N, N) history of rolling moments (see iter_rolling_moments; missing="pairwise" for ragged histories).
+    Memory is T * N² floats, for large universes prefer iterating the blocks.
+    """
+    T, N = return_dataframe.shape
+    count = np.full(T, np.nan)
+    mean = np.empty((T, N), dtype=dtype)
+    cov = np.empty((T, N, N), dtype=dtype)
+    for sl, c, m, s in iter_rolling_moments(return_dataframe, window, block_size, min_count, dtype,
+                                            missing, psd_repair):
+        count[sl], mean[sl], cov[sl] = c, m, s
+    return MomentSeries(return_dataframe.index, return_dataframe.columns, count, mean, cov)
+
+
+def batch_cholesky(cov: np.ndarray) -> np.ndarray:
+    """
+    Cholesky factors for a stack of covariance matrices (B, N, N) in one LAPACK call.
+    NaN matrices give NaN factors.
+    If some matrix is not positive definite, that one falls back to Σ + 1e-8·I (same fallback as the MC loop).
+    """
+    L = np.full(cov.shape, np.nan, dtype=cov.dtype)
+    ok = ~np.isnan(cov).any(axis=(1, 2))
+    if not ok.any():
+        return L
+    try:
+        L[ok] = np.linalg.cholesky(cov[ok])
+    except np.linalg.LinAlgError:
+        eye = np.eye(cov.shape[-1], dtype=cov.dtype)
+        for i in np.flatnonzero(ok):
+            try:
+                L[i] = np.linalg.cholesky(cov[i])
+            except np.linalg.LinAlgError:
+                L[i] = np.linalg.cholesky(cov[i] + 1e-8 * eye)
+    return L
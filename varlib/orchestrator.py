@@ -0,0 +1,171 @@
+"""
+Run orchestrator: the model x alpha x portfolio grid on a process pool.
+
+Every (model, portfolio[, alpha]) combination is an independent task. The asset return matrix is put once into
+shared memory (multiprocessing.shared_memory); workers attach to it by name and wrap it in a DataFrame without
+copying, so tasks carry only names, weights and a seed. A ReturnMatrix saved on disk is not copied at all: every worker
+memory-maps the same values.npy and the OS shares the pages.
+
+Each task gets its own child of SeedSequence(random_seed), spawned in grid order before anything runs,
+so random models give the same numbers for any n_jobs (and for n_jobs=1, which runs in-process).
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import shared_memory
+from typing import Callable, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from varlib.return_matrix import ReturnMatrix
+from varlib.returns import portfolio_returns
+from varlib.tail import batch_var_es_frame
+from varlib.var_history import filtered_history_var_es, history_var_expected_loss
+from varlib.var_montecarlo import rolling_montecarlo_var_es_batched
+from varlib.var_parametric import rolling_parametric_var_es
+
+
+def _hs(rets, weights, alphas, window, seed, opts):
+    return history_var_expected_loss(portfolio_returns(rets, weights), alpha=alphas, window=window)
+
+
+def _fhs(rets, weights, alphas, window, seed, opts):
+    return filtered_history_var_es(portfolio_returns(rets, weights), alpha=alphas, window=window,
+                                   ewma_lambda=opts.get("ewma_lambda", 0.94))
+
+
+def _parametric(rets, weights, alphas, window, seed, opts):
+    return rolling_parametric_var_es(portfolio_returns(rets, weights), alpha=alphas, window=window, use_ewma=False)
+
+
+def _parametric_ewma(rets, weights, alphas, window, seed, opts):
+    return rolling_parametric_var_es(portfolio_returns(rets, weights), alpha=alphas, window=window, use_ewma=True,
+                                     ewma_lambda=opts.get("ewma_lambda", 0.94))
+
+
+def _montecarlo(rets, weights, alphas, window, seed, opts):
+    return rolling_montecarlo_var_es_batched(rets, weights, alpha=alphas, window=window,
+                                             n_simulations=opts.get("n_simulations", 20000), random_seed=seed)
+
+
+# model name -> f(asset returns, weights dict, alpha list, window, SeedSequence, options) -> (alpha, VaR/ES) frame
+MODELS: dict[str, Callable] = {
+    "hs": _hs,
+    "fhs": _fhs,
+    "parametric": _parametric,
+    "parametric_ewma": _parametric_ewma,
+    "montecarlo": _montecarlo,
+}
+
+# worker-side view of the shared return matrix (set by _attach)
+_WORKER: dict = {}
+
+
+def _wrap(values: np.ndarray, index, columns) -> pd.DataFrame:
+    return pd.DataFrame(values, index=pd.DatetimeIndex(index), columns=columns, copy=False)
+
+
+def _frame_values(ret_df: pd.DataFrame | ReturnMatrix) -> np.ndarray:
+    if isinstance(ret_df, ReturnMatrix):
+        return ret_df.values.astype(np.float64)
+    return ret_df.to_numpy(dtype=np.float64)
+
+
+def _attach(shm_name: str, shape: tuple[int, int], dtype: str, index: np.ndarray, columns: list) -> None:
+    """Pool initializer: attach to the shared block and wrap it (no copy)."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _WORKER["shm"] = shm
+    _WORKER["rets"] = _wrap(np.ndarray(shape, dtype=dtype, buffer=shm.buf), index, columns)
+
+
+def _open(path: str) -> None:
+    """Pool initializer for an on-disk ReturnMatrix: memory-map it read-only."""
+    _WORKER["rets"] = ReturnMatrix.open(path)
+
+
+def _run_task(task) -> np.ndarray:
+    model, weights, alphas, window, seed, opts = task
+    out = MODELS[model](_WORKER["rets"], weights, list(alphas), window, seed, opts)
+    return out.to_numpy(dtype=float).reshape(len(out), len(alphas), 2)
+
+
+def build_task_grid(
+    models: Sequence[str],
+    portfolios: Sequence,
+    alphas: Sequence[float],
+    split_alphas: bool = False,
+) -> list[tuple[str, object, tuple[float, ...]]]:
+    """
+    (model, portfolio, alphas) tasks in a fixed order.
+    split_alphas=False: one task per (model, portfolio) computing all alphas (windows sorted / simulated once),
+    True: one task per (model, portfolio, alpha) - more, smaller tasks for few portfolios and many cores.
+    """
+    unknown = set(models) - set(MODELS)
+    if unknown:
+        raise ValueError(f"Unknown models {sorted(unknown)}, choose from {tuple(MODELS)}.")
+    groups = [(a,) for a in alphas] if split_alphas else [tuple(alphas)]
+    return [(m, p, g) for m, p, g in product(models, portfolios, groups)]
+
+
+def run_grid(
+    ret_df: pd.DataFrame | ReturnMatrix,
+    weights: Mapping[str, float] | pd.DataFrame,
+    alphas: Sequence[float] = (0.95, 0.99),
+    window: int = 250,
+    models: Sequence[str] = tuple(MODELS),
+    n_jobs: Optional[int] = None,
+    split_alphas: bool = False,
+    random_seed: int = 42,
+    **model_options,
+) -> dict[str, pd.DataFrame]:
+    """
+    Run every model for every portfolio and alpha, in parallel.
+    weights: one dict, or a P x N DataFrame (index = portfolio ids, columns = tickers).
+    n_jobs: pool size (None = all cores, 1 = in-process, no pool).
+    model_options: passed to the models (n_simulations, ewma_lambda).
+    ret_df may be a ReturnMatrix; with a path (ReturnMatrix.save / open) the workers map the file instead of
+    receiving a shared-memory copy, and results are the same for any n_jobs.
+
+    Returns {model: DataFrame with columns MultiIndex (portfolio, alpha, VaR/ES)} (as batch_var_es), lagged.
+    """
+    W = pd.DataFrame([weights], index=["portfolio"]) if not isinstance(weights, pd.DataFrame) else weights
+    alphas = list(alphas)
+    grid = build_task_grid(models, W.index, alphas, split_alphas)
+    seeds = np.random.SeedSequence(random_seed).spawn(len(grid))
+    tasks = [(m, W.loc[p].dropna().to_dict(), g, window, s, model_options) for (m, p, g), s in zip(grid, seeds)]
+
+    mapped = isinstance(ret_df, ReturnMatrix) and ret_df.path is not None
+    if mapped:
+        values = ret_df.values
+    else:
+        # same (T, N) C-ordered float64 layout in-process and in the workers, so the numbers match bit for bit
+        values = np.ascontiguousarray(_frame_values(ret_df))
+    if n_jobs == 1:
+        _WORKER["rets"] = ret_df if mapped else _wrap(values, ret_df.index, ret_df.columns)
+        try:
+            results = [_run_task(x) for x in tasks]
+        finally:
+            _WORKER.clear()
+    elif mapped:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_open, initargs=(str(ret_df.path),)) as pool:
+            results = list(pool.map(_run_task, tasks))
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        try:
+            np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+            init = (shm.name, values.shape, values.dtype.str, ret_df.index.to_numpy(), list(ret_df.columns))
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach, initargs=init) as pool:
+                results = list(pool.map(_run_task, tasks))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    out = {}
+    for m in models:
+        cube = np.full((len(ret_df), len(W.index), len(alphas), 2), np.nan)
+        for (tm, p, g), res in zip(grid, results):
+            if tm == m:
+                cube[:, W.index.get_loc(p), [alphas.index(a) for a in g]] = res
+        out[m] = batch_var_es_frame(ret_df.index, W.index, alphas, cube[..., 0], cube[..., 1])
+    return out
@@ -1,16 +1,111 @@
+"""
+Report figures. Every plot function can
+- draw and save (savepath) or show the figure,
+- return only the data it would draw (data_only=True, no matplotlib work at all),
+- thin long daily series to max_points before drawing (decimate: min-max or LTTB, exceedances always kept).
+
+render_figures draws a whole batch of (kind, kwargs) jobs, optionally on a process pool, with the
+non-interactive Agg backend selected before the first figure.
+"""
 from __future__ import annotations
+import inspect
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional, Sequence
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from varlib.instrument import instrument
+from varlib.return_matrix import as_frame, as_series
+from varlib.var_montecarlo import _weight_vector, simulate_portfolio_losses
 
 
 def _ensure_dir(path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
 
 
+def use_backend(name: str = "Agg") -> None:
+    """Select the matplotlib backend up front (Agg: no GUI, figures only go to files)."""
+    import matplotlib
+    if matplotlib.get_backend().lower() != name.lower():
+        matplotlib.use(name, force=True)
+
+
+def _pyplot():
+    """matplotlib.pyplot, imported on the first figure (data_only runs and model-only jobs never load it)."""
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _save_or_show(fig, savepath: Optional[Path]) -> None:
+    plt = _pyplot()
+    if savepath:
+        _ensure_dir(savepath)
+        fig.savefig(savepath, bbox_inches="tight", dpi=140)
+        plt.close(fig)
+    else:
+        plt.show()
+
+
+def _minmax_index(y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """Positions of the min and max of each of n_buckets equal buckets (one reshape, no loop)."""
+    T = y.shape[0]
+    size = -(-T // n_buckets)
+    pad = np.full((size * n_buckets - T,) + y.shape[1:], np.nan)
+    Y = np.concatenate([y, pad]).reshape((n_buckets, size) + y.shape[1:])
+    # NaN never wins; an all-NaN bucket just gives its first point
+    lo = np.argmin(np.where(np.isnan(Y), np.inf, Y), axis=1)
+    hi = np.argmax(np.where(np.isnan(Y), -np.inf, Y), axis=1)
+    start = (np.arange(n_buckets) * size).reshape((n_buckets,) + (1,) * (y.ndim - 1))
+    return np.concatenate([(start + lo).ravel(), (start + hi).ravel()])
+
+
+def _lttb_index(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets on (position, y): keeps the first and last point and, per bucket, the point
+    spanning the largest triangle with the previously kept point and the mean of the next bucket.
+    """
+    T = y.shape[0]
+    x = np.arange(T, dtype=float)
+    y = np.where(np.isnan(y), np.nanmean(y) if np.isfinite(y).any() else 0.0, y)
+    edges = np.linspace(1, T - 1, n_out - 1).astype(int)
+    out = np.empty(n_out, dtype=int)
+    out[0], out[-1] = 0, T - 1
+    prev = 0
+    for k in range(n_out - 2):
+        a, b = edges[k], max(edges[k + 1], edges[k] + 1)
+        c = edges[k + 2] if k + 2 < len(edges) else T
+        nx, ny = (x[b:c].mean(), y[b:c].mean()) if c > b else (x[-1], y[-1])
+        area = np.abs((x[prev] - nx) * (y[a:b] - y[prev]) - (x[prev] - x[a:b]) * (ny - y[prev]))
+        prev = a + int(np.argmax(area))
+        out[k + 1] = prev
+    return out
+
+
+def decimate(values: np.ndarray, max_points: Optional[int], method: str = "minmax") -> np.ndarray:
+    """
+    Sorted row positions to draw so that a (T,) or (T, K) series keeps its visual shape with about max_points
+    points per column: "minmax" keeps the low and high of each of max_points/2 buckets (every spike survives),
+    "lttb" picks one point per bucket by Largest-Triangle-Three-Buckets. Columns are thinned separately and
+    the union of their positions is returned, so all lines share one x axis.
+    max_points=None, or a series that is already short enough, keeps every row.
+    """
+    values = np.asarray(values, dtype=float)
+    T = values.shape[0]
+    if max_points is None or T <= max_points:
+        return np.arange(T)
+    if method == "minmax":
+        idx = _minmax_index(values, max(1, max_points // 2))
+    elif method == "lttb":
+        cols = values.reshape(T, -1)
+        idx = np.concatenate([_lttb_index(cols[:, j], max(3, max_points)) for j in range(cols.shape[1])])
+    else:
+        raise ValueError(f"method must be 'minmax' or 'lttb', got {method!r}.")
+    return np.unique(np.concatenate([[0, T - 1], idx[idx < T]]))
+
+
 def _to_var_series(obj: pd.Series | pd.DataFrame) -> pd.Series:
     """Return a VaR Series from either a Series or a DataFrame with column 'VaR'."""
     if isinstance(obj, pd.DataFrame):
@@ -20,70 +115,87 @@ def _to_var_series(obj: pd.Series | pd.DataFrame) -> pd.Series:
     return obj
 
 
+@instrument
 def plot_pnl_vs_var(
     port_ret: pd.Series,
     var_dict: Dict[str, pd.Series | pd.DataFrame],
     alpha: float,
     highlight: str = "HS",
     savepath: Optional[Path] = None,
-) -> None:
+    max_points: Optional[int] = None,
+    decimation: str = "minmax",
+    data_only: bool = False,
+) -> Optional[pd.DataFrame]:
     """
     Simple overlay: portfolio daily returns and -VaR lines for each method.
     We also mark exceedances for the 'highlight' method.
+
+    Dates where the return or any VaR is missing are dropped (one mask over a (T, M) array, no concat).
+    max_points thins the lines (see decimate); exceedances are always drawn in full.
+    data_only=True returns the drawn data (columns r, -VaR <method>..., exceedance) instead of plotting.
     """
-    # Prepare data
-    aligned = pd.concat(
-        [port_ret.rename("r")] + [(-_to_var_series(v)).rename(f"-VaR {k}") for k, v in var_dict.items()],
-        axis=1,
-    ).dropna()
+    port_ret = as_series(port_ret)
+    # Prepare data: every VaR on the return dates, keep the rows where everything is known
+    names = ["r"] + [f"-VaR {k}" for k in var_dict]
+    M = np.column_stack([port_ret.to_numpy(dtype=float)]
+                        + [-_to_var_series(v).reindex(port_ret.index).to_numpy(dtype=float)
+                           for v in var_dict.values()])
+    keep = ~np.isnan(M).any(axis=1)
+    M, dates = M[keep], port_ret.index[keep]
 
-    if aligned.empty:
+    if len(dates) == 0:
         raise ValueError("No overlap between returns and VaR series.")
 
+    # Exceedances for highlighted method: -r_t > VaR_t  <=> r_t < -VaR_t
+    hits = M[:, 0] < M[:, names.index(f"-VaR {highlight}")]
+    rows = np.union1d(decimate(M, max_points, decimation), np.flatnonzero(hits))
+    if data_only:
+        out = pd.DataFrame(M[rows], index=dates[rows], columns=names)
+        out["exceedance"] = hits[rows]
+        return out
+
     # Plot
-    fig, ax = plt.subplots(figsize=(12, 5))
-    ax.plot(aligned.index, aligned["r"], linewidth=1.0, label="Portfolio return (r_t)")
+    fig, ax = _pyplot().subplots(figsize=(12, 5))
+    ax.plot(dates[rows], M[rows, 0], linewidth=1.0, label="Portfolio return (r_t)")
 
-    for k in var_dict.keys():
-        ax.plot(aligned.index, aligned[f"-VaR {k}"], linewidth=1.0, label=f"-VaR {k}")
+    for j, k in enumerate(var_dict.keys(), start=1):
+        ax.plot(dates[rows], M[rows, j], linewidth=1.0, label=f"-VaR {k}")
 
-    # Exceedances for highlighted method: -r_t > VaR_t  <=> r_t < -VaR_t
-    hl_col = f"-VaR {highlight}"
-    hits = aligned["r"] < aligned[hl_col]
-    ax.scatter(aligned.index[hits], aligned.loc[hits, "r"], s=18, marker="o", label=f"Exceedances ({highlight})")
+    ax.scatter(dates[hits], M[hits, 0], s=18, marker="o", label=f"Exceedances ({highlight})")
 
     ax.set_title(f"P&L vs -VaR (alpha={alpha:.2f})")
     ax.set_ylabel("Daily return")
     ax.grid(True, linewidth=0.4, alpha=0.6)
     ax.legend(loc="best", ncol=2)
 
-    if savepath:
-        _ensure_dir(savepath)
-        plt.savefig(savepath, bbox_inches="tight", dpi=140)
-        plt.close(fig)
-    else:
-        plt.show()
+    _save_or_show(fig, savepath)
+    return None
 
 
+@instrument
 def plot_kupiec_expected_vs_actual(
     backtest_table: pd.DataFrame,
     alpha: float,
     savepath: Optional[Path] = None,
-) -> None:
+    data_only: bool = False,
+) -> Optional[pd.DataFrame]:
     """
     Bar chart comparing expected vs actual exceedances (Kupiec coverage).
     Assumes backtest_table contains columns: 'T' and 'exceedances' and index = method names.
+    data_only=True returns the bars (columns expected, actual) instead of plotting.
     """
     if backtest_table.empty:
         raise ValueError("Backtest table is empty.")
 
     expected = (1 - alpha) * backtest_table["T"]
     actual = backtest_table["exceedances"]
+    if data_only:
+        return pd.DataFrame({"expected": expected, "actual": actual})
 
     x = np.arange(len(backtest_table.index))
     width = 0.35
 
-    fig, ax = plt.subplots(figsize=(10, 4))
+    fig, ax = _pyplot().subplots(figsize=(10, 4))
     ax.bar(x - width / 2, expected.values, width, label="Expected")
     ax.bar(x + width / 2, actual.values, width, label="Actual")
 
@@ -93,14 +205,11 @@ def plot_kupiec_expected_vs_actual(
     ax.grid(True, axis="y", linewidth=0.4, alpha=0.6)
     ax.legend(loc="best")
 
-    if savepath:
-        _ensure_dir(savepath)
-        plt.savefig(savepath, bbox_inches="tight", dpi=140)
-        plt.close(fig)
-    else:
-        plt.show()
+    _save_or_show(fig, savepath)
+    return None
 
 
+@instrument
 def plot_mc_loss_histogram(
     ret_df: pd.DataFrame,
     weights: dict[str, float],
@@ -108,24 +217,28 @@ def plot_mc_loss_histogram(
     n_sims: int,
     alpha: float,
     savepath: Optional[Path] = None,
-) -> None:
+    max_memory_mb: float = 64.0,
+    bins: int = 60,
+    data_only: bool = False,
+) -> Optional[pd.DataFrame]:
     """
     Simple MC histogram for the last available day:
     - Calibrate mean and covariance on the trailing `window`.
-    - Simulate 1-day portfolio returns.
-    - Plot histogram of losses (-returns).
+    - Simulate 1-day portfolio returns (in chunks, only portfolio P&L is kept, see simulate_portfolio_losses).
+    - Plot histogram of losses (-returns); the counts are binned once with np.histogram and drawn as steps,
+      so only `bins` bars reach matplotlib, not n_sims points.
+    data_only=True returns the bins (columns left, right, count) instead of plotting.
     """
+    ret_df = as_frame(ret_df)
     if len(ret_df) < window + 1:
         raise ValueError("Not enough data to calibrate the MC window.")
 
     # Use the last window [T-window, T-1]
     calib = ret_df.iloc[-window:]
     cols = list(calib.columns)
-    W = np.array([weights.get(c, 0.0) for c in cols], dtype=float)
-    s = W.sum()
-    if s == 0:
+    if sum(weights.values()) == 0:
         raise ValueError("Weights sum to zero.")
-    W = W / s
+    W = _weight_vector(cols, weights)
 
     mu = calib.mean().to_numpy()
     cov = np.cov(calib.to_numpy().T, ddof=1)
@@ -136,21 +249,115 @@ def plot_mc_loss_histogram(
         L = np.linalg.cholesky(cov)
 
     rng = np.random.default_rng(42)
-    z = rng.standard_normal((calib.shape[1], n_sims))
-    sims = (mu[:, None] + L @ z).T
-    port_sims = sims @ W
-    losses = -port_sims
+    losses = simulate_portfolio_losses(mu, L, W, n_sims, rng, max_memory_mb=max_memory_mb)
 
-    fig, ax = plt.subplots(figsize=(9, 4))
-    ax.hist(losses, bins=60)
+    counts, edges = np.histogram(losses, bins=bins)
+    if data_only:
+        return pd.DataFrame({"left": edges[:-1], "right": edges[1:], "count": counts})
+
+    fig, ax = _pyplot().subplots(figsize=(9, 4))
+    ax.stairs(counts, edges, fill=True)
     ax.set_title(f"Monte Carlo 1-day losses (window={window}, sims={n_sims}, alpha={alpha:.2f})")
     ax.set_xlabel("Loss")
     ax.set_ylabel("Frequency")
     ax.grid(True, linewidth=0.4, alpha=0.6)
 
+    _save_or_show(fig, savepath)
+    return None
+
+
+@instrument
+def plot_rolling_hitrate(
+    monitors: Dict[str, pd.DataFrame],
+    alpha: float,
+    savepath: Optional[Path] = None,
+    max_points: Optional[int] = None,
+    decimation: str = "minmax",
+    data_only: bool = False,
+) -> Optional[pd.DataFrame]:
+    """
+    Rolling exceedance rate (from rolling_backtest_monitor) for each method vs the expected rate 1 - alpha.
+    max_points thins the lines (see decimate); data_only=True returns the hit rates (one column per method).
+    """
+    rates = pd.DataFrame({k: mon["hit_rate"] for k, mon in monitors.items()})
+    rates = rates.iloc[decimate(rates.to_numpy(dtype=float), max_points, decimation)]
+    if data_only:
+        return rates
+
+    fig, ax = _pyplot().subplots(figsize=(12, 4))
+    for k in rates.columns:
+        ax.plot(rates.index, rates[k], linewidth=1.0, label=k)
+    ax.axhline(1 - alpha, color="black", linestyle="--", linewidth=0.8, label=f"Expected ({1 - alpha:.1%})")
+
+    ax.set_title(f"Rolling exceedance rate (alpha={alpha:.2f})")
+    ax.set_ylabel("Hit rate")
+    ax.grid(True, linewidth=0.4, alpha=0.6)
+    ax.legend(loc="best", ncol=2)
+
+    _save_or_show(fig, savepath)
+    return None
+
+
+# figure kind -> plot function; a render job is (kind, keyword arguments incl. savepath)
+FIGURES: dict[str, Callable] = {
+    "pnl_vs_var": plot_pnl_vs_var,
+    "kupiec_expected_vs_actual": plot_kupiec_expected_vs_actual,
+    "mc_loss_histogram": plot_mc_loss_histogram,
+    "rolling_hitrate": plot_rolling_hitrate,
+}
+
+
+def _render_job(job: tuple[str, dict], data_only: bool, max_points: Optional[int]):
+    kind, kwargs = job
+    fn = FIGURES[kind]
+    kwargs = dict(kwargs)
+    if "max_points" in inspect.signature(fn).parameters:
+        kwargs.setdefault("max_points", max_points)
+    if not data_only:
+        fn(**kwargs)
+        return kwargs.get("savepath")
+    kwargs["data_only"] = True
+    data = fn(**kwargs)
+    savepath = kwargs.get("savepath")
     if savepath:
+        # per-figure data next to where the image would go
+        savepath = Path(savepath).with_suffix(".csv")
         _ensure_dir(savepath)
-        plt.savefig(savepath, bbox_inches="tight", dpi=140)
-        plt.close(fig)
-    else:
-        plt.show()
+        data.to_csv(savepath)
+    return data
+
+
+def _render_chunk(jobs: list[tuple[str, dict]], data_only: bool, max_points: Optional[int]) -> list:
+    if not data_only:
+        use_backend("Agg")
+    return [_render_job(j, data_only, max_points) for j in jobs]
+
+
+def render_figures(
+    jobs: Sequence[tuple[str, dict]],
+    n_jobs: Optional[int] = 1,
+    max_points: Optional[int] = 2000,
+    data_only: bool = False,
+) -> list:
+    """
+    Render a batch of figures; jobs = [(kind, kwargs), ...] with kind from FIGURES, kwargs including savepath.
+    - Agg backend is selected before anything is drawn (no GUI, figures only go to files).
+    - max_points: default thinning for the daily line charts (a job's own max_points wins, None = full data).
+    - n_jobs > 1 (None = all cores) splits the jobs into n_jobs chunks on a process pool; each worker draws
+      its chunk. Jobs carry their own data, so the output does not depend on n_jobs.
+    - data_only=True draws nothing: each job's data frame is returned (and written to <savepath>.csv).
+    Returns one entry per job, in order: the savepath (drawn) or the data frame (data_only).
+    """
+    jobs = list(jobs)
+    unknown = {k for k, _ in jobs} - set(FIGURES)
+    if unknown:
+        raise ValueError(f"Unknown figures {sorted(unknown)}, choose from {tuple(FIGURES)}.")
+    if n_jobs == 1 or len(jobs) <= 1:
+        return _render_chunk(jobs, data_only, max_points)
+
+    n = min(n_jobs or os.cpu_count() or 1, len(jobs))
+    # contiguous chunks keep the result order; one chunk per worker amortizes the matplotlib start-up
+    chunks = [jobs[i * len(jobs) // n:(i + 1) * len(jobs) // n] for i in range(n)]
+    with ProcessPoolExecutor(max_workers=n) as pool:
+        parts = list(pool.map(_render_chunk, chunks, [data_only] * n, [max_points] * n))
+    return [x for part in parts for x in part]
@@ -0,0 +1,192 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Optional, Protocol, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class PriceSource(Protocol):
+    """Anything that returns Adjusted Close prices: DataFrame (Date index, columns = tickers), dates inclusive."""
+
+    def fetch(self, tickers: Sequence[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        ...
+
+
+class YahooSource:
+    """Yahoo Finance through yfinance (imported only when something is really downloaded)."""
+
+    def fetch(self, tickers: Sequence[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        import yfinance as yf
+        # yfinance `end` is exclusive
+        data = yf.download(list(tickers), start=start.strftime("%Y-%m-%d"),
+                           end=(end + pd.Timedelta(days=1)).strftime("%Y-%m-%d"),
+                           auto_adjust=False, progress=False)["Adj Close"]
+        if isinstance(data, pd.Series):
+            data = data.to_frame(name=tickers[0])
+        return data
+
+
+class DirectorySource:
+    """
+    Offline stand-in source: one CSV per ticker in a directory, `<root>/<TICKER>.csv`,
+    first column = date, price column "Adj Close" (or the only other column).
+    Used for bulk loads of local data and for running everything without network.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def tickers(self) -> list[str]:
+        return sorted(p.stem for p in self.root.glob("*.csv"))
+
+    def read(self, ticker: str) -> pd.Series:
+        df = pd.read_csv(self.root / f"{ticker}.csv", index_col=0, parse_dates=True)
+        col = "Adj Close" if "Adj Close" in df.columns else df.columns[0]
+        return df[col].rename(ticker).sort_index()
+
+    def fetch(self, tickers: Sequence[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        cols = {}
+        for t in tickers:
+            if (self.root / f"{t}.csv").exists():
+                s = self.read(t)
+                cols[t] = s.loc[(s.index >= start) & (s.index <= end)]
+        return pd.DataFrame(cols)
+
+
+def restate(stored: pd.Series, fresh: pd.Series, rtol: float = 1e-6) -> pd.Series:
+    """
+    Bring stored adjusted prices onto the basis of freshly fetched ones.
+    A split or dividend makes the source rescale every adjusted price before its ex-date by one factor,
+    so the ratio fresh / stored on the latest date both contain is that factor for the whole stored history
+    (assuming no event inside the stored range since it was fetched). Stored prices are multiplied by it
+    when it differs from 1; without a common date they are returned unchanged.
+    """
+    common = stored.index.intersection(fresh.dropna().index)
+    if stored.empty or common.empty:
+        return stored
+    d = common.max()
+    factor = float(fresh.loc[d]) / float(stored.loc[d])
+    if np.isfinite(factor) and not np.isclose(factor, 1.0, rtol=rtol, atol=0.0):
+        return stored * factor
+    return stored
+
+
+class PriceStore:
+    """
+    Local columnar price store, one file per ticker: `<root>/<TICKER>.npz` with
+    dates (int64, ns), prices (float64) and the date range already fetched (covered_start, covered_end).
+
+    load() only asks the source for the parts of [start, end] that are not covered yet
+    (before the first / after the last covered date), so a daily run downloads one day, not the full history.
+    Covered ranges are kept separately from the price dates, so weekends/holidays are not re-requested.
+
+    Adjusted Close is restated by the source after every split / dividend. Each fetch therefore also asks for
+    the stored price date next to the missing range (last one for a newer range, first one for an older range),
+    and when the source's value there differs the stored history is rescaled onto the new basis (restate),
+    so a join never carries a fake split return and older dividends are not lost.
+    """
+
+    def __init__(self, root: str | Path, source: Optional[PriceSource] = None):
+        self.root = Path(root)
+        self.source = source
+
+    def _path(self, ticker: str) -> Path:
+        return self.root / f"{ticker.replace('/', '_')}.npz"
+
+    def read(self, ticker: str) -> tuple[pd.Series, Optional[tuple[pd.Timestamp, pd.Timestamp]]]:
+        """Stored prices of one ticker and the covered range (None if nothing stored)."""
+        path = self._path(ticker)
+        if not path.exists():
+            return pd.Series(dtype=float, name=ticker), None
+        with np.load(path) as f:
+            s = pd.Series(f["prices"], index=pd.DatetimeIndex(f["dates"].astype("datetime64[ns]")), name=ticker)
+            covered = (pd.Timestamp(int(f["covered_start"])), pd.Timestamp(int(f["covered_end"])))
+        return s, covered
+
+    def write(self, ticker: str, prices: pd.Series, covered: tuple[pd.Timestamp, pd.Timestamp]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        prices = prices.dropna()
+        prices = prices[~prices.index.duplicated(keep="last")].sort_index()
+        np.savez(
+            self._path(ticker),
+            dates=prices.index.to_numpy(dtype="datetime64[ns]").astype(np.int64),
+            prices=prices.to_numpy(dtype=np.float64),
+            covered_start=np.int64(covered[0].value),
+            covered_end=np.int64(covered[1].value),
+        )
+
+    def missing_ranges(self, ticker: str, start: pd.Timestamp, end: pd.Timestamp) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        _, covered = self.read(ticker)
+        if covered is None:
+            return [(start, end)]
+        out = []
+        if start < covered[0]:
+            out.append((start, covered[0] - pd.Timedelta(days=1)))
+        if end > covered[1]:
+            out.append((covered[1] + pd.Timedelta(days=1), end))
+        return out
+
+    def refresh(self, tickers: Sequence[str], start: pd.Timestamp, end: pd.Timestamp) -> None:
+        """Fetch only the missing date ranges; tickers that miss the same range are fetched together."""
+        todo: dict[tuple[pd.Timestamp, pd.Timestamp], list[str]] = {}
+        for t in tickers:
+            stored, covered = self.read(t)
+            for a, b in self.missing_ranges(t, start, end):
+                # overlap one stored price date to detect a restated adjusted history
+                if not stored.empty and covered is not None:
+                    if a > covered[1]:
+                        a = stored.index.max()
+                    elif b < covered[0]:
+                        b = stored.index.min()
+                todo.setdefault((a, b), []).append(t)
+        if todo and self.source is None:
+            raise ValueError("Prices are missing from the store and no source was given.")
+
+        fetched: dict[str, list[pd.Series]] = {}
+        for (a, b), names in todo.items():
+            data = self.source.fetch(names, a, b)
+            for t in names:
+                fetched.setdefault(t, []).append(data[t] if t in data.columns else pd.Series(dtype=float))
+
+        for t, parts in fetched.items():
+            stored, covered = self.read(t)
+            fresh = pd.concat(parts)
+            lo = start if covered is None else min(start, covered[0])
+            hi = end if covered is None else max(end, covered[1])
+            # fresh values win on the overlap dates
+            self.write(t, pd.concat([restate(stored, fresh), fresh]), (lo, hi))
+
+    def load(self, tickers: Sequence[str], start: str = "2005-01-01", end: Optional[str] = None) -> pd.DataFrame:
+        """
+        Same output as load_prices_yf (Date index, columns = tickers, all-NaN rows dropped, sorted),
+        served from the store after fetching what is missing.
+        end=None means up to yesterday (today's close is not final yet, it is fetched again tomorrow).
+        """
+        start_ts = pd.Timestamp(start)
+        end_ts = pd.Timestamp(end) if end is not None else pd.Timestamp.today().normalize() - pd.Timedelta(days=1)
+        self.refresh(tickers, start_ts, end_ts)
+        cols = {}
+        for t in tickers:
+            s, _ = self.read(t)
+            cols[t] = s.loc[(s.index >= start_ts) & (s.index <= end_ts)]
+        data = pd.DataFrame(cols, columns=list(tickers))
+        data.index.name = "Date"
+        return data.dropna(how="all").sort_index()
+
+    def import_directory(self, path: str | Path, tickers: Optional[Sequence[str]] = None) -> list[str]:
+        """
+        Bulk load: put every `<TICKER>.csv` of a local directory into the store
+        (covered range = first..last date in the file; stored prices are restated onto the file's basis,
+        the file wins on common dates). Returns the imported tickers.
+        """
+        src = DirectorySource(path)
+        names = list(tickers) if tickers is not None else src.tickers()
+        for t in names:
+            s = src.read(t)
+            stored, covered = self.read(t)
+            lo, hi = s.index.min(), s.index.max()
+            if covered is not None:
+                lo, hi = min(lo, covered[0]), max(hi, covered[1])
+            self.write(t, pd.concat([restate(stored, s), s]), (lo, hi))
+        return names
@@ -0,0 +1,153 @@
+"""
+ReturnMatrix: one compact copy of the asset returns for the whole run.
+
+values (T, N) is a plain NumPy array, float32 or float64, optionally a read-only memory map of `<path>/values.npy`,
+so several processes (batch / orchestrator workers) share the same pages through the OS cache.
+Dates and tickers are kept next to it as separate indexes. Windows are slices of `values` (views, no copy).
+
+portfolio_returns, the HS / parametric / MC models and the backtests accept a ReturnMatrix wherever they take a
+returns DataFrame (or a portfolio return Series, for a one-column matrix).
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# rows converted / multiplied at a time when building or reducing the matrix (bounds the float64 temporaries)
+_CHUNK_ROWS = 4096
+
+
+@dataclass(frozen=True)
+class ReturnMatrix:
+    """
+    values  = returns, shape (T, N), float32 or float64 (np.memmap when opened from disk)
+    dates   = DatetimeIndex (T)
+    tickers = Index (N)
+    path    = directory the matrix lives in (None for an in-memory matrix)
+    """
+    values: np.ndarray
+    dates: pd.DatetimeIndex
+    tickers: pd.Index
+    path: Optional[Path] = None
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.values.shape
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        return self.dates
+
+    @property
+    def columns(self) -> pd.Index:
+        return self.tickers
+
+    @classmethod
+    def from_frame(cls, ret_df: pd.DataFrame, dtype=np.float32, path: Optional[str | Path] = None) -> "ReturnMatrix":
+        """Store an existing returns frame (converted in row chunks; written to `path` as a memory map if given)."""
+        out = _allocate(path, ret_df.shape, dtype)
+        for a in range(0, len(ret_df), _CHUNK_ROWS):
+            out[a:a + _CHUNK_ROWS] = ret_df.iloc[a:a + _CHUNK_ROWS].to_numpy(dtype=np.float64)
+        return _finish(out, pd.DatetimeIndex(ret_df.index), ret_df.columns, path)
+
+    @classmethod
+    def from_prices(cls, prices: pd.DataFrame, dtype=np.float32, path: Optional[str | Path] = None) -> "ReturnMatrix":
+        """
+        Log returns of a price frame, same result as to_log_returns (all-NaN rows dropped), but computed in
+        row chunks straight into the output array: no shifted copy, no full-size float64 temporaries.
+        """
+        P = prices.to_numpy(dtype=np.float64, copy=False)
+        # a return row is all-NaN when no column has both prices
+        keep = np.zeros(max(len(P) - 1, 0), dtype=bool)
+        for a in range(0, len(keep), _CHUNK_ROWS):
+            b = min(a + _CHUNK_ROWS, len(keep))
+            keep[a:b] = (~np.isnan(P[a:b]) & ~np.isnan(P[a + 1:b + 1])).any(axis=1)
+        rows = np.flatnonzero(keep) + 1
+
+        out = _allocate(path, (rows.size, P.shape[1]), dtype)
+        for a in range(0, rows.size, _CHUNK_ROWS):
+            r = rows[a:a + _CHUNK_ROWS]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[a:a + r.size] = np.log(P[r] / P[r - 1])
+        return _finish(out, pd.DatetimeIndex(prices.index[rows]), prices.columns, path)
+
+    @classmethod
+    def open(cls, path: str | Path, mmap_mode: Optional[str] = "r") -> "ReturnMatrix":
+        """Open a saved matrix; values are memory-mapped (mmap_mode=None loads them into RAM)."""
+        path = Path(path)
+        values = np.load(path / "values.npy", mmap_mode=mmap_mode)
+        dates = pd.DatetimeIndex(np.load(path / "dates.npy").astype("datetime64[ns]"), name="Date")
+        tickers = pd.Index(np.load(path / "tickers.npy"))
+        return cls(values, dates, tickers, path)
+
+    def save(self, path: str | Path) -> "ReturnMatrix":
+        """Write to `path` (values.npy, dates.npy, tickers.npy) and return the memory-mapped copy."""
+        out = _allocate(path, self.shape, self.values.dtype)
+        for a in range(0, len(self), _CHUNK_ROWS):
+            out[a:a + _CHUNK_ROWS] = self.values[a:a + _CHUNK_ROWS]
+        return _finish(out, self.dates, self.tickers, path)
+
+    def window(self, end: int, window: int) -> np.ndarray:
+        """Rows [end-window, end) as a view."""
+        return self.values[max(end - window, 0):end]
+
+    def windows(self, window: int) -> np.ndarray:
+        """Every window at once, (T-window+1, N, window) view (sliding_window_view, no copy)."""
+        return sliding_window_view(self.values, window, axis=0)
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame over the same buffer (no copy for a single-dtype matrix)."""
+        return pd.DataFrame(self.values, index=self.dates, columns=self.tickers, copy=False)
+
+    def to_series(self) -> pd.Series:
+        """The only column as a Series (for a matrix of one portfolio's returns)."""
+        if self.shape[1] != 1:
+            raise ValueError(f"Expected a one-column ReturnMatrix, got {self.shape[1]} columns.")
+        return pd.Series(self.values[:, 0], index=self.dates, name=self.tickers[0], copy=False)
+
+    def portfolio(self, weights: np.ndarray) -> np.ndarray:
+        """
+        values @ weights for a (N,) or (N, P) weight array, in row chunks with missing returns as 0
+        (float64 result, only one chunk is upcast at a time).
+        """
+        W = np.asarray(weights, dtype=np.float64)
+        out = np.empty((len(self),) + W.shape[1:])
+        for a in range(0, len(self), _CHUNK_ROWS):
+            out[a:a + _CHUNK_ROWS] = np.nan_to_num(self.values[a:a + _CHUNK_ROWS].astype(np.float64)) @ W
+        return out
+
+
+def _allocate(path: Optional[str | Path], shape: tuple[int, int], dtype) -> np.ndarray:
+    if path is None:
+        return np.empty(shape, dtype=dtype)
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    return np.lib.format.open_memmap(path / "values.npy", mode="w+", dtype=dtype, shape=shape)
+
+
+def _finish(values: np.ndarray, dates: pd.DatetimeIndex, tickers: pd.Index,
+            path: Optional[str | Path]) -> ReturnMatrix:
+    if path is None:
+        return ReturnMatrix(values, dates.rename("Date"), pd.Index(tickers))
+    path = Path(path)
+    values.flush()
+    np.save(path / "dates.npy", dates.to_numpy(dtype="datetime64[ns]").astype(np.int64))
+    np.save(path / "tickers.npy", np.asarray(tickers, dtype=str))
+    return ReturnMatrix.open(path)
+
+
+def as_frame(obj):
+    """ReturnMatrix -> zero-copy DataFrame; anything else is returned as is."""
+    return obj.to_frame() if isinstance(obj, ReturnMatrix) else obj
+
+
+def as_series(obj):
+    """One-column ReturnMatrix -> zero-copy Series; anything else is returned as is."""
+    return obj.to_series() if isinstance(obj, ReturnMatrix) else obj
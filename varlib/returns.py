@@ -2,6 +2,9 @@ from __future__ import annotations
 import numpy as np
 import pandas as pd
 
+from varlib.instrument import instrument
+from varlib.return_matrix import ReturnMatrix
+
 def normalize_weights(weights: dict[str, float]) -> pd.Series:
     """
     We just want to normalize the weights so that they sum up to 1.
@@ -14,7 +17,8 @@ def normalize_weights(weights: dict[str, float]) -> pd.Series:
         w = w / s
     return w
 
-def portfolio_returns(ret_df: pd.DataFrame, weights: dict[str, float]) -> pd.Series:
+@instrument
+def portfolio_returns(ret_df: pd.DataFrame | ReturnMatrix, weights: dict[str, float]) -> pd.Series:
     """
     //// r_p,t = SUM_i (w_i * r_i,t) ////
     R_pt = portfolio returns in moment "t", more precise "at day t", summed up
@@ -23,8 +27,38 @@ def portfolio_returns(ret_df: pd.DataFrame, weights: dict[str, float]) -> pd.Ser
 
     .sum(axis=1) adds up the information per ROW, and ignores NaN values. Example: 2024-01-02: added up to 1.4%
     Output: pd.Series, index=dates(t),  values=(porfolio return R_pt)
+    A ReturnMatrix is reduced in row chunks (ReturnMatrix.portfolio), same numbers, no full float64 copy.
     """
     w = normalize_weights(weights)
     # reindex to existing columns; fill missing weights (NaN) as 0.0
     w = w.reindex(ret_df.columns).fillna(0.0)
-    return (ret_df * w).sum(axis=1)
\ No newline at end of file
+    if isinstance(ret_df, ReturnMatrix):
+        return pd.Series(ret_df.portfolio(w.to_numpy()), index=ret_df.index)
+    return (ret_df * w).sum(axis=1)
+
+def normalize_weight_matrix(weights_matrix: pd.DataFrame, columns: pd.Index) -> pd.DataFrame:
+    """
+    normalize_weights for many portfolios at once.
+    weights_matrix: rows = portfolios (P), columns = instruments.
+    Each row is scaled to sum 1 (if it does not already), then aligned to `columns` (missing = 0.0).
+    """
+    w = weights_matrix.astype(float)
+    s = w.sum(axis=1)
+    s = s.where(~np.isclose(s, 1.0), 1.0)
+    w = w.div(s, axis=0)
+    return w.reindex(columns=columns).fillna(0.0)
+
+
+@instrument
+def portfolio_returns_batch(ret_df: pd.DataFrame | ReturnMatrix, weights_matrix: pd.DataFrame) -> pd.DataFrame:
+    """
+    Portfolio returns for P weight vectors in one matrix product:
+    R (T x P) = r (T x N) @ Wᵀ (N x P)
+    Missing returns count as 0, same as .sum(axis=1) in portfolio_returns.
+    Output: DataFrame, index = dates, columns = portfolios (index of weights_matrix).
+    """
+    W = normalize_weight_matrix(weights_matrix, ret_df.columns)
+    if isinstance(ret_df, ReturnMatrix):
+        return pd.DataFrame(ret_df.portfolio(W.to_numpy().T), index=ret_df.index, columns=weights_matrix.index)
+    R = np.nan_to_num(ret_df.to_numpy(dtype=float)) @ W.to_numpy().T
+    return pd.DataFrame(R, index=ret_df.index, columns=weights_matrix.index)
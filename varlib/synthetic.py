@@ -0,0 +1,59 @@
+from __future__ import annotations
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_returns(
+    T: int = 1000,
+    N: int = 5,
+    df: float = 5.0,
+    vol_levels: Sequence[float] = (0.01, 0.025),
+    stay_prob: Sequence[float] = (0.98, 0.95),
+    rho: float = 0.3,
+    start: str = "2015-01-01",
+    random_seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Deterministic synthetic daily log returns (no download needed), same layout as to_log_returns:
+    Date index (business days), columns A0..A{N-1}.
+
+    r_t = σ_{s_t} · √((ν-2)/ν) · L z_t / √(g_t/ν)     (multivariate t, unit-variance scaled)
+    - s_t: Markov regime (calm / stressed by default), P(stay in regime k) = stay_prob[k],
+      daily vol σ_k = vol_levels[k] times a per-asset factor in [0.7, 1.3]
+    - L: Cholesky of an equicorrelation matrix with correlation rho
+    - z_t ~ N(0, I), g_t ~ χ²_ν (one draw per day, shared by all assets -> joint fat tails)
+    Same arguments -> same data.
+    """
+    rng = np.random.default_rng(random_seed)
+    vols = np.asarray(vol_levels, dtype=float)
+    stay = np.asarray(stay_prob, dtype=float)
+    K = vols.size
+
+    # regime path: leave the current regime with prob 1 - stay, then pick any other regime uniformly
+    u = rng.random(T)
+    jump = rng.integers(1, K, size=T) if K > 1 else np.zeros(T, dtype=int)
+    regime = np.empty(T, dtype=int)
+    s = 0
+    for t in range(T):
+        if u[t] > stay[s]:
+            s = (s + jump[t]) % K
+        regime[t] = s
+
+    corr = np.full((N, N), rho)
+    np.fill_diagonal(corr, 1.0)
+    L = np.linalg.cholesky(corr)
+    z = rng.standard_normal((T, N)) @ L.T
+    g = rng.chisquare(df, size=T)
+    scale = np.sqrt((df - 2) / g)[:, None]
+    asset_vol = rng.uniform(0.7, 1.3, size=N)
+    data = vols[regime][:, None] * asset_vol * scale * z
+    return pd.DataFrame(data, index=pd.bdate_range(start, periods=T, name="Date"),
+                        columns=[f"A{i}" for i in range(N)])
+
+
+def synthetic_weights(N: int, random_seed: int = 0) -> dict[str, float]:
+    """Random long-only weights (sum to 1) for the columns of synthetic_returns."""
+    w = np.random.default_rng(random_seed).dirichlet(np.ones(N))
+    return {f"A{i}": float(x) for i, x in enumerate(w)}
@@ -0,0 +1,54 @@
+from __future__ import annotations
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def tail_var_es(losses: np.ndarray, alphas: Sequence[float], axis: int = -1) -> tuple[np.ndarray, np.ndarray]:
+    """
+    VaR and ES for several alpha levels from one sample of losses (positive = loss).
+    VaR_α = linear α-quantile of the losses (same as np.quantile / pandas "linear").
+    ES_α  = mean of the losses >= VaR_α (same tail definition as the HS model).
+
+    The quantiles for all alphas come from one np.quantile call (one partition of the sample).
+    Returns (var, es), each with the `axis` dimension replaced by a trailing alpha dimension: shape (..., A).
+    """
+    x = np.moveaxis(np.asarray(losses, dtype=float), axis, -1)
+    alphas = np.asarray(alphas, dtype=float)
+    var = np.moveaxis(np.quantile(x, alphas, axis=-1), 0, -1)
+    es = np.empty_like(var)
+    for k in range(alphas.size):
+        v = var[..., k, None]
+        tail = x >= v
+        with np.errstate(invalid="ignore", divide="ignore"):
+            es[..., k] = np.where(tail, x, 0.0).sum(axis=-1) / tail.sum(axis=-1)
+    return var, es
+
+
+def var_es_frame(index: pd.Index, alphas: Sequence[float], var: np.ndarray, es: np.ndarray) -> pd.DataFrame:
+    """
+    Wide frame with MultiIndex columns (alpha, "VaR"/"ES").
+    var, es have shape (T, A). frame[alpha] gives the usual VaR/ES frame for that level.
+    """
+    T, A = var.shape
+    data = np.empty((T, 2 * A))
+    data[:, 0::2] = var
+    data[:, 1::2] = es
+    columns = pd.MultiIndex.from_product([list(alphas), ["VaR", "ES"]], names=["alpha", "stat"])
+    return pd.DataFrame(data, index=index, columns=columns)
+
+
+def batch_var_es_frame(
+    index: pd.Index, portfolios: Sequence, alphas: Sequence[float], var: np.ndarray, es: np.ndarray
+) -> pd.DataFrame:
+    """
+    Wide frame for many portfolios: columns MultiIndex (portfolio, alpha, "VaR"/"ES").
+    var, es have shape (T, P, A). frame[p] gives the (alpha, VaR/ES) frame of one portfolio.
+    """
+    T, P, A = var.shape
+    data = np.stack([var, es], axis=-1).reshape(T, P * A * 2)
+    columns = pd.MultiIndex.from_product(
+        [list(portfolios), list(alphas), ["VaR", "ES"]], names=["portfolio", "alpha", "stat"]
+    )
+    return pd.DataFrame(data, index=index, columns=columns)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from varlib.instrument import instrument
+from varlib.return_matrix import as_frame, as_series
+from varlib.tail import batch_var_es_frame, var_es_frame
+
+# returns are fitted in percent (x100) so ω is not ~1e-6 for the optimizer
+_SCALE = 100.0
+# mu, omega, alpha, beta, nu
+_BOUNDS = [(-1.0, 1.0), (1e-6, 10.0), (0.0, 0.5), (0.0, 0.999), (2.1, 200.0)]
+
+
+def garch_variance(params: np.ndarray, r: np.ndarray, sigma2_0: Optional[float] = None) -> np.ndarray:
+    """
+    GARCH(1,1) conditional variance for the whole series in one call:
+    σ²_t = ω + a ε²_{t-1} + b σ²_{t-1},  ε = r - μ.
+    This is a first-order IIR filter on ε², so scipy.signal.lfilter runs the recursion in C (no Python loop).
+    σ²_0 = sample variance of the window if not given.
+    """
+    from scipy.signal import lfilter
+    mu, omega, a, b, _ = params
+    eps2 = (r - mu) ** 2
+    s0 = float(np.var(r)) if sigma2_0 is None else sigma2_0
+    out = np.empty_like(eps2)
+    out[0] = s0
+    if r.size > 1:
+        out[1:] = lfilter([1.0], [1.0, -b], omega + a * eps2[:-1], zi=[b * s0])[0]
+    return out
+
+
+def garch_t_negloglik(params: np.ndarray, r: np.ndarray) -> float:
+    """
+    Negative log-likelihood of GARCH(1,1) with standardized Student-t errors (unit variance), vectorized:
+    ℓ_t = lnΓ((ν+1)/2) - lnΓ(ν/2) - ½ ln(π(ν-2)σ²_t) - (ν+1)/2 · ln(1 + ε²_t / ((ν-2)σ²_t))
+    a + b >= 1 (no stationary variance) is rejected with a large value.
+    """
+    from scipy.special import gammaln
+    mu, omega, a, b, nu = params
+    if a + b >= 0.9999:
+        return 1e10
+    s2 = garch_variance(params, r)
+    if np.any(s2 <= 0) or not np.all(np.isfinite(s2)):
+        return 1e10
+    eps2 = (r - mu) ** 2
+    ll = (gammaln((nu + 1) / 2) - gammaln(nu / 2) - 0.5 * np.log(np.pi * (nu - 2) * s2)
+          - (nu + 1) / 2 * np.log1p(eps2 / ((nu - 2) * s2)))
+    return float(-ll.sum())
+
+
+def _default_start(r: np.ndarray) -> np.ndarray:
+    v = float(np.var(r))
+    return np.array([float(np.mean(r)), v * 0.05, 0.05, 0.90, 8.0])
+
+
+def fit_garch_t(r: np.ndarray, x0: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    ML fit (L-BFGS-B) on returns in decimal form; x0 = previous window's params for a warm start
+    (neighbouring windows share 249 of 250 days, so the optimum barely moves and few iterations are needed).
+    Returns params (μ, ω, a, b, ν) in decimal units.
+    """
+    from scipy.optimize import minimize
+    rs = r * _SCALE
+    if x0 is None:
+        start = _default_start(rs)
+    else:
+        start = np.array(x0, dtype=float)
+        start[0] *= _SCALE
+        start[1] *= _SCALE ** 2
+    start = np.array([np.clip(x, lo, hi) for x, (lo, hi) in zip(start, _BOUNDS)])
+    res = minimize(garch_t_negloglik, start, args=(rs,), method="L-BFGS-B", bounds=_BOUNDS)
+    p = res.x.copy()
+    p[0] /= _SCALE
+    p[1] /= _SCALE ** 2
+    return p
+
+
+def garch_t_var_es(mu, sigma, nu, alpha) -> tuple[np.ndarray, np.ndarray]:
+    """
+    VaR/ES (positive = loss) when r = μ + σ·e, e = standardized Student-t(ν) (unit variance):
+    VaR_α = -μ + σ s q,                      q = t_ν⁻¹(α), s = √((ν-2)/ν)
+    ES_α  = -μ + σ s f_ν(q)/(1-α) · (ν+q²)/(ν-1)
+    """
+    from scipy.stats import t as student_t
+    q = student_t.ppf(alpha, nu)
+    s = np.sqrt((nu - 2) / nu)
+    var = -mu + sigma * s * q
+    es = -mu + sigma * s * student_t.pdf(q, nu) / (1 - alpha) * (nu + q ** 2) / (nu - 1)
+    return var, es
+
+
+@instrument
+def rolling_garch_var_es(
+    portfolio_returns: pd.Series,
+    alpha: float | Sequence[float] = 0.95,
+    window: int = 250,
+    refit_every: int = 20,
+    lagged: bool = True,
+    start_params: Optional[np.ndarray] = None,
+) -> pd.DataFrame:
+    """
+    GARCH(1,1)-t VaR/ES, rolling window (same convention as rolling_parametric_var_es: value at t uses data up to t,
+    lagged=True shifts it to the day it forecasts).
+
+    - every `refit_every` days: ML refit on the last `window` returns, warm-started from the previous fit,
+      then the window is filtered once to get σ²_t,
+    - in between: filter-only update σ²_{t+1} = ω + a ε²_t + b σ²_t with the current params (O(1) per day).
+    refit_every=1 refits every window.
+    Returns VaR/ES frame, or columns MultiIndex (alpha, VaR/ES) if alpha is a list.
+    """
+    portfolio_returns = as_series(portfolio_returns)
+    multi = np.ndim(alpha) > 0
+    alphas = np.atleast_1d(np.asarray(alpha, dtype=float))
+    r_all = portfolio_returns.to_numpy(dtype=float)
+    T = r_all.size
+    var = np.full((T, alphas.size), np.nan)
+    es = np.full((T, alphas.size), np.nan)
+
+    params = start_params
+    s2 = None
+    for t in range(window - 1, T):
+        if np.isnan(r_all[t]):
+            s2 = None
+            continue
+        if s2 is None or (t - window + 1) % refit_every == 0:
+            r = r_all[t - window + 1:t + 1]
+            if np.isnan(r).any():
+                s2 = None
+                continue
+            params = fit_garch_t(r, params)
+            s2 = garch_variance(params, r)[-1]
+        mu, omega, a, b, nu = params
+        # forecast for t+1 from the state at t
+        s2_next = omega + a * (r_all[t] - mu) ** 2 + b * s2
+        var[t], es[t] = garch_t_var_es(mu, np.sqrt(s2_next), nu, alphas)
+        s2 = s2_next
+
+    if multi:
+        out = var_es_frame(portfolio_returns.index, list(alpha), var, es)
+    else:
+        out = pd.DataFrame({"VaR": var[:, 0], "ES": es[:, 0]}, index=portfolio_returns.index)
+    if lagged:
+        out = out.shift(1)
+    return out
+
+
+def _garch_column(args) -> np.ndarray:
+    values, alphas, window, refit_every = args
+    out = rolling_garch_var_es(pd.Series(values), list(alphas), window, refit_every, lagged=False)
+    return out.to_numpy().reshape(len(values), len(alphas), 2)
+
+
+@instrument
+def batch_garch_var_es(
+    port_rets: pd.DataFrame,
+    alphas: Sequence[float] = (0.95, 0.99),
+    window: int = 250,
+    refit_every: int = 20,
+    lagged: bool = True,
+    n_jobs: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    rolling_garch_var_es for every column (portfolio) of port_rets, fitted in parallel on a process pool
+    (one task per portfolio; n_jobs=None -> all cores, n_jobs=1 -> no pool).
+    Columns MultiIndex (portfolio, alpha, VaR/ES).
+    """
+    port_rets = as_frame(port_rets)
+    alphas = list(alphas)
+    tasks = [(port_rets[c].to_numpy(dtype=float), alphas, window, refit_every) for c in port_rets.columns]
+    if n_jobs == 1:
+        results = [_garch_column(x) for x in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_garch_column, tasks))
+    res = np.stack(results, axis=1)                 # (T, P, A, 2)
+    out = batch_var_es_frame(port_rets.index, port_rets.columns, alphas, res[..., 0], res[..., 1])
+    return out.shift(1) if lagged else out
@@ -1,9 +1,18 @@
+from typing import Sequence
+
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from varlib.instrument import instrument
+from varlib.return_matrix import as_frame, as_series
+from varlib.tail import batch_var_es_frame, tail_var_es, var_es_frame
+from varlib.var_parametric import emwa_vol
 
+@instrument
 def history_var_expected_loss(
     portfolio_returns: pd.Series,
-    alpha: float = 0.95,
+    alpha: float | Sequence[float] = 0.95,
     window: int = 250,
     lagged: bool = True,
 ) -> pd.DataFrame:
@@ -22,7 +31,13 @@ def history_var_expected_loss(
     HS: VaR = α-quantile losses = quantile(-r).
     ES = mean(losses >= VaR) per window
     ES (expected Shortfall) is the average loss in the tail left of VaR vertical line
+
+    If alpha is a list, every window is partitioned once for all levels (sliding_history_var_es)
+    and the result is a wide frame with columns MultiIndex (alpha, VaR/ES).
     """
+    portfolio_returns = as_series(portfolio_returns)
+    if np.ndim(alpha) > 0:
+        return sliding_history_var_es(portfolio_returns, alphas=alpha, window=window, lagged=lagged)
 
     # losses will be represented as POSITIVE numbers Lt = -Rpt
     # (if the return is -2%, the loss is +2%)
@@ -44,3 +59,91 @@ def history_var_expected_loss(
     if lagged:
         out = out.shift(1)
     return out
+
+
+def sliding_history_var_es(
+    portfolio_returns: pd.Series | pd.DataFrame,
+    alphas: Sequence[float] = (0.95, 0.99),
+    window: int = 250,
+    lagged: bool = True,
+    block_size: int = 4096,
+) -> pd.DataFrame:
+    """
+    Same HS VaR/ES as history_var_expected_loss, for several alphas in one pass and without
+    a Python function per window.
+
+    sliding_window_view gives all windows of the losses as a (T-window+1, window) view (no copy),
+    then blocks of windows are partitioned together (np.quantile -> np.partition, O(window) per window,
+    not a full sort), and VaR and ES for every alpha are read from that one partition (tail_var_es).
+    Memory is bounded by block_size * window floats.
+
+    Windows with a NaN give NaN (like .rolling(window) with the default min_periods).
+    Returns wide frame, columns MultiIndex (alpha, VaR/ES).
+    A DataFrame of many portfolio return series (T x P) is done in the same pass;
+    columns are then MultiIndex (portfolio, alpha, VaR/ES).
+    """
+    portfolio_returns = as_frame(portfolio_returns)
+    alphas = list(alphas)
+    batch = isinstance(portfolio_returns, pd.DataFrame)
+    losses = -portfolio_returns.to_numpy(dtype=float)
+    if not batch:
+        losses = losses[:, None]
+    T, P = losses.shape
+    var = np.full((T, P, len(alphas)), np.nan)
+    es = np.full((T, P, len(alphas)), np.nan)
+
+    if T >= window:
+        windows = sliding_window_view(losses, window, axis=0)      # (T-window+1, P, window)
+        step = max(1, block_size // P)
+        for a in range(0, windows.shape[0], step):
+            blk = windows[a:a + step]
+            v, e = tail_var_es(blk, alphas, axis=-1)
+            bad = np.isnan(blk).any(axis=-1)
+            v[bad] = np.nan
+            e[bad] = np.nan
+            # window ending at row window-1+a
+            var[window - 1 + a: window - 1 + a + blk.shape[0]] = v
+            es[window - 1 + a: window - 1 + a + blk.shape[0]] = e
+
+    if batch:
+        out = batch_var_es_frame(portfolio_returns.index, portfolio_returns.columns, alphas, var, es)
+    else:
+        out = var_es_frame(portfolio_returns.index, alphas, var[:, 0], es[:, 0])
+    if lagged:
+        out = out.shift(1)
+    return out
+
+
+@instrument
+def filtered_history_var_es(
+    portfolio_returns: pd.Series,
+    alpha: float | Sequence[float] = 0.95,
+    window: int = 250,
+    ewma_lambda: float = 0.94,
+    lagged: bool = True,
+) -> pd.DataFrame:
+    """
+    Filtered Historical Simulation (FHS):
+    1) σ_t from the EWMA filter (emwa_vol); emwa_vol at t already contains r_t, so it is the forecast for t+1
+       and the volatility that applied ON day t is σ_{t-1}.
+    2) devolatilize: z_t = r_t / σ_{t-1}   (standardized residuals, roughly iid)
+    3) HS on the residual losses -z over the rolling window (sliding_history_var_es, no Python per window)
+    4) rescale by the current σ_t: VaR_t = σ_t * VaR_z,t ,  ES_t = σ_t * ES_z,t
+
+    So the tail shape is empirical (fat tails kept) and the scale reacts like EWMA.
+    Returns VaR/ES frame, or columns MultiIndex (alpha, VaR/ES) if alpha is a list.
+    """
+    portfolio_returns = as_series(portfolio_returns)
+    sigma = emwa_vol(portfolio_returns, lam=ewma_lambda)
+    z = portfolio_returns / sigma.shift(1)
+
+    multi = np.ndim(alpha) > 0
+    alphas = list(alpha) if multi else [alpha]
+    out = sliding_history_var_es(z, alphas, window=window, lagged=False)
+    out = out.mul(sigma, axis=0)
+    if not multi:
+        out = out[alphas[0]]
+        out.columns.name = None
+    if lagged:
+        out = out.shift(1)
+    return out
@@ -0,0 +1,130 @@
+"""
+Multi-horizon (h-day) VaR/ES without square-root-of-time scaling.
+All horizons come out of one run; results are wide frames with columns MultiIndex (horizon, alpha, VaR/ES),
+frame[10][0.99] is the usual VaR/ES frame of the 10-day 99% model.
+Returns are log returns, so an h-day return is the sum of h daily ones.
+"""
+from __future__ import annotations
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from varlib.instrument import add_counts, instrument
+from varlib.moments import iter_rolling_moments
+from varlib.return_matrix import as_series
+from varlib.tail import batch_var_es_frame, tail_var_es
+from varlib.var_history import sliding_history_var_es
+from varlib.var_montecarlo import _weight_vector
+from varlib.var_parametric import ewma_covariance
+
+HORIZONS = (1, 5, 10, 20)
+
+
+def overlapping_returns(portfolio_returns: pd.Series, horizons: Sequence[int] = HORIZONS) -> pd.DataFrame:
+    """
+    Overlapping h-day returns R_h(t) = r_{t-h+1} + ... + r_t for every horizon, from ONE cumulative sum:
+    R_h(t) = c_t - c_{t-h}. Columns = horizons. Sums with a missing day are NaN.
+    """
+    portfolio_returns = as_series(portfolio_returns)
+    r = portfolio_returns.to_numpy(dtype=float)
+    T = r.size
+    h = np.asarray(horizons, dtype=int)
+    c = np.concatenate([[0.0], np.cumsum(np.nan_to_num(r))])
+    n_bad = np.concatenate([[0], np.cumsum(np.isnan(r))])
+    t = np.arange(1, T + 1)[:, None]
+    lo = t - h[None, :]                                         # (T, H)
+    valid = lo >= 0
+    lo = np.clip(lo, 0, None)
+    out = c[t] - c[lo]
+    out[~valid | (n_bad[t] - n_bad[lo] > 0)] = np.nan
+    return pd.DataFrame(out, index=portfolio_returns.index, columns=pd.Index(list(horizons), name="horizon"))
+
+
+@instrument
+def history_var_es_horizons(
+    portfolio_returns: pd.Series,
+    alphas: Sequence[float] = (0.95, 0.99),
+    horizons: Sequence[int] = HORIZONS,
+    window: int = 250,
+    lagged: bool = True,
+) -> pd.DataFrame:
+    """
+    HS VaR/ES of h-day losses: empirical quantile of the last `window` OVERLAPPING h-day returns
+    (so window + h - 1 days of data; horizon 1 is exactly history_var_expected_loss).
+    All horizons are stacked as columns of one (T, H) frame and go through sliding_history_var_es together:
+    one sliding-window view, one partition per window for every horizon and alpha.
+    Value at t uses data up to t and is the loss over the next h days (lagged=True shifts it like the 1-day models).
+    Columns MultiIndex (horizon, alpha, VaR/ES).
+    """
+    out = sliding_history_var_es(overlapping_returns(portfolio_returns, horizons), alphas, window, lagged)
+    return out.rename_axis(columns=["horizon", "alpha", "stat"])
+
+
+@instrument
+def rolling_montecarlo_var_es_horizons(
+    return_dataframe: pd.DataFrame,
+    weights: dict[str, float],
+    alphas: Sequence[float] = (0.95, 0.99),
+    horizons: Sequence[int] = HORIZONS,
+    window: int = 250,
+    n_simulations: int = 20000,
+    ewma_lambda: Optional[float] = None,
+    lagged: bool = True,
+    random_seed: int = 42,
+    max_block_elements: int = 2 ** 24,
+) -> pd.DataFrame:
+    """
+    MC VaR/ES of h-day losses from simulated h-step paths, all horizons from one set of paths.
+    Per date (same window convention as rolling_montecarlo_var_es: date t is calibrated on [t-window, t-1]):
+    μ_p = w'μ, σ²_p = w'Σw, then portfolio steps r_k = μ_p + σ_k z_k, k = 1..max(horizons):
+
+    - ewma_lambda=None: σ_k = σ_p (i.i.d. normal steps; Σ from the rolling window),
+    - ewma_lambda=λ:    Σ is the EWMA covariance (ewma_covariance) and the variance is propagated along each path,
+                        σ²_{k+1} = λ σ²_k + (1-λ) (r_k - μ_p)², so volatility clusters inside the horizon
+                        and h-day losses get fatter tails than √h scaling gives.
+
+    A block of dates is one (B, steps, n_simulations) tensor; the h-day sums for every horizon are read off one
+    cumulative sum over the steps (no loop per horizon). Columns MultiIndex (horizon, alpha, VaR/ES).
+    """
+    alphas = list(alphas)
+    horizons = list(horizons)
+    steps = max(horizons)
+    hix = np.asarray(horizons) - 1
+    rng = np.random.default_rng(random_seed)
+    W = _weight_vector(list(return_dataframe.columns), weights)
+    idx = return_dataframe.index
+    T = len(idx)
+    var = np.full((T, len(horizons), len(alphas)), np.nan)
+    es = np.full((T, len(horizons), len(alphas)), np.nan)
+    block = max(1, max_block_elements // (2 * steps * n_simulations))
+
+    if ewma_lambda is None:
+        moments = ((sl, m @ W, np.einsum("bij,i,j->b", s, W, W))
+                   for sl, _, m, s in iter_rolling_moments(return_dataframe, window, block_size=block))
+    else:
+        ms = ewma_covariance(return_dataframe, lam=ewma_lambda, window=window)
+        moments = ((slice(a, min(a + block, T)), ms.mean[a:a + block] @ W,
+                    np.einsum("bij,i,j->b", ms.cov[a:a + block], W, W)) for a in range(0, T, block))
+
+    for sl, mu_p, var_p in moments:
+        rows = np.arange(sl.start, sl.stop) + 1
+        ok = ~np.isnan(mu_p) & ~np.isnan(var_p) & (rows < T)
+        if not ok.any():
+            continue
+        mu, s2 = mu_p[ok][:, None], np.clip(var_p[ok], 0.0, None)[:, None]
+        z = rng.standard_normal((int(ok.sum()), steps, n_simulations))
+        add_counts(paths=int(ok.sum()) * n_simulations)
+        if ewma_lambda is None:
+            eps = np.sqrt(s2)[:, :, None] * z
+        else:
+            eps = np.empty_like(z)
+            for k in range(steps):                             # recursion over steps, vectorized over dates and paths
+                eps[:, k] = np.sqrt(s2) * z[:, k]
+                s2 = ewma_lambda * s2 + (1 - ewma_lambda) * eps[:, k] ** 2
+        cum = np.cumsum(eps, axis=1)[:, hix]                   # (B, H, S) demeaned h-day returns
+        losses = -(cum + mu[:, :, None] * (hix + 1)[None, :, None])
+        var[rows[ok]], es[rows[ok]] = tail_var_es(losses, alphas, axis=-1)
+
+    out = batch_var_es_frame(idx, horizons, alphas, var, es).rename_axis(columns=["horizon", "alpha", "stat"])
+    return out.shift(1) if lagged else out
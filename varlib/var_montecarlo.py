@@ -1,46 +1,80 @@
+from typing import Sequence
+
 import numpy as np
 import pandas as pd
 
+from varlib.instrument import add_counts, instrument
+from varlib.moments import batch_cholesky, iter_rolling_moments, nearest_psd
+from varlib.return_matrix import as_frame
+from varlib.returns import normalize_weights
+from varlib.tail import tail_var_es, var_es_frame
+
+@instrument
 def rolling_montecarlo_var_es(
     return_dataframe: pd.DataFrame,
     weights: dict[str, float],
-    alpha: float = 0.95,
+    alpha: float | Sequence[float] = 0.95,
     window: int = 250,
     n_simulations: int = 20000,
     lagged: bool = True,
     random_seed: int = 42,
+    missing: str = "drop",
 ) -> pd.Series:
     """
     For every day `t` use the window [t-window, t-1] to find μ (vector) and Σ,
     then simulate porfolio's 1-day return r_p ~ N(w'μ, w'Σw) using multivariate normal + Cholesky
 
-    Returns rolling VaR.
-    (ES can be calculated later, analogously)
+    Returns rolling VaR (Series "VaR") for a single alpha; ES is estimated from the same paths (mean of the
+    losses >= VaR) and returned when alpha is a list, see below.
+
+    missing = "drop": only complete rows of the window are used (dropna(how="any")),
+              "pairwise": every available observation (per-asset means, pairwise-complete covariance,
+              repaired to the nearest PSD matrix), so one late-listed ticker does not empty the window.
+
+    If alpha is a list, every day is simulated once and all levels are read from the same paths;
+    the result is then a wide frame with VaR and ES, columns MultiIndex (alpha, VaR/ES).
     """
+    return_dataframe = as_frame(return_dataframe)
+    multi = np.ndim(alpha) > 0
+    alphas = list(alpha) if multi else [alpha]
 
     rng = np.random.default_rng(random_seed)
     cols = list(return_dataframe.columns)
-    W = np.array([weights.get(c, 0.0) for c in cols], dtype=float)
-    W = W / (np.sum(W) if np.sum(W) != 0 else 1.0)
+    W = _weight_vector(cols, weights)
 
     var_vals = []
+    es_vals = []
     idx = return_dataframe.index
+    nan_row = np.full(len(alphas), np.nan)
 
     for t in range(len(idx)):
         if t < window:
-            var_vals.append(np.nan)
+            var_vals.append(nan_row)
+            es_vals.append(nan_row)
             continue
         # window_data = return_dataframe.iloc[t - window: t]
-        window_data = return_dataframe.iloc[t - window: t].dropna(how="any")
-        if len(window_data) < 2:
-            var_vals.append(np.nan)
-            continue
+        if missing == "pairwise":
+            window_data = return_dataframe.iloc[t - window: t]
+            mean = window_data.mean().to_numpy()
+            # pandas .cov() is pairwise-complete; pairs with < 2 common days are NaN
+            cov = window_data.cov(min_periods=2).to_numpy()
+            if np.isnan(cov).any():
+                var_vals.append(nan_row)
+                es_vals.append(nan_row)
+                continue
+            cov = nearest_psd(cov[None])[0]
+        else:
+            window_data = return_dataframe.iloc[t - window: t].dropna(how="any")
+            if len(window_data) < 2:
+                var_vals.append(nan_row)
+                es_vals.append(nan_row)
+                continue
 
-        mean = window_data.mean().to_numpy()
-        # Covariance is N x N matrix, measures the "connection/correlation" between 2 instruments
-        # On diagonals: there are variance of each instrument σ²
-        # On all other fields: covariance of pairs (how instruments go with each other)
-        cov = np.cov(window_data.to_numpy().T, ddof=1)
+            mean = window_data.mean().to_numpy()
+            # Covariance is N x N matrix, measures the "connection/correlation" between 2 instruments
+            # On diagonals: there are variance of each instrument σ²
+            # On all other fields: covariance of pairs (how instruments go with each other)
+            cov = np.cov(window_data.to_numpy().T, ddof=1)
 
         # If Σ is simetric and positive, there is L so that Σ = L * Lᵀ
         # L is the Cholesky matrix of covariance (N x N)
@@ -55,6 +89,7 @@ def rolling_montecarlo_var_es(
         # rows: n - number of instruments
         # cols: number of simulations
         z = rng.standard_normal((window_data.shape[1], n_simulations))
+        add_counts(paths=n_simulations)
 
         # L @ Z is the "CORRELATED" sum of return simulations
         correlated = L @ z  # shape (n_assets, n_sims)
@@ -67,11 +102,571 @@ def rolling_montecarlo_var_es(
 
         portfolio_sims = sims @ W  # portfolio simulated returns
         losses = -portfolio_sims
-        var = np.quantile(losses, alpha)
-        var_vals.append(float(var))
+        var, es = tail_var_es(losses, alphas)
+        var_vals.append(var)
+        es_vals.append(es)
+
+    if multi:
+        out = var_es_frame(idx, alphas, np.array(var_vals), np.array(es_vals))
+        return out.shift(1) if lagged else out
+
+    var_series = pd.Series(np.array(var_vals)[:, 0], index=idx)
+
+    if lagged:
+        var_series = var_series.shift(1)
+    return var_series.rename("VaR")
+
+def _weight_vector(cols: list, weights: dict[str, float]) -> np.ndarray:
+    """
+    Weights aligned to the columns, normalized like portfolio_returns / normalize_weight_matrix:
+    scaled to sum 1 over all given tickers first, then tickers without returns get 0 (their exposure is dropped,
+    not spread over the others), so every model sees the same exposures.
+    """
+    if sum(weights.values()) == 0:
+        return np.zeros(len(cols))
+    return normalize_weights(weights).reindex(cols).fillna(0.0).to_numpy(dtype=float)
+
+
+def _iter_batched_losses(
+    return_dataframe: pd.DataFrame,
+    Wmat: np.ndarray,
+    window: int,
+    n_simulations: int,
+    rng: np.random.Generator,
+    block_size: int | None = None,
+    max_block_elements: int = 2 ** 24,
+    portfolio_draws: bool = False,
+    missing: str = "drop",
+    moments_block_size: int | None = None,
+    portfolio_chunk: int | None = None,
+):
+    """
+    Simulated 1-day losses for P weight vectors (rows of Wmat, shape (P, N)), one block of dates at a time.
+    All portfolios are revalued on the SAME asset scenarios: w_p'(μ + L z) = w_p'μ + (Lᵀw_p)' z.
+    Yields (rows, cols, losses) with rows = output positions (loop convention: date t uses [t-window, t-1]),
+    cols = slice of the portfolios and losses of shape (B, len(cols), n_simulations).
+
+    Three sizes:
+    - moments_block_size = dates per iter_rolling_moments block (default: as many (N, N) matrices as fit in
+      max_block_elements, at most 512), so the add/drop update runs over long stretches of dates
+      and X'X is recomputed only once per block,
+    - block_size = dates simulated at once inside a moments block (default: B * (N + P) * n_simulations
+      <= max_block_elements); it only slices the moments, the random stream is the same for any sizes,
+    - portfolio_chunk = portfolios revalued at once (default: all of them if one date fits in
+      max_block_elements, else as many as fit next to the date's (N, n_simulations) normals), so thousands of
+      portfolios never materialize a (P, n_simulations) array. The normals of a date are drawn once and shared.
+
+    portfolio_draws=True draws the P portfolio returns directly from their P x P covariance
+    (w_p'Σw_q = (Lᵀw_p)'(Lᵀw_q)) instead of N asset normals; used only when P <= N.
+    """
+    T, N = return_dataframe.shape
+    P = Wmat.shape[0]
+    project = portfolio_draws and P <= N
+    if block_size is None:
+        per_date = (P if project else N + P) * n_simulations
+        block_size = max(1, max_block_elements // max(1, per_date))
+    zdim = P if project else N
+    if portfolio_chunk is None:
+        fits = (zdim + P) * n_simulations <= max_block_elements
+        portfolio_chunk = P if fits else max(1, max_block_elements // max(1, n_simulations) - zdim)
+    if moments_block_size is None:
+        moments_block_size = int(np.clip(max_block_elements // (2 * N * N), block_size, 512))
+
+    # moments entry t covers [t-window+1, t]; the loop's date t uses [t-window, t-1] -> entry t-1
+    for sl, count, mean_all, cov_all in iter_rolling_moments(return_dataframe, window,
+                                                             block_size=moments_block_size, missing=missing):
+        for a in range(0, sl.stop - sl.start, block_size):
+            mean, cov = mean_all[a:a + block_size], cov_all[a:a + block_size]
+            rows = np.arange(sl.start + a, sl.start + a + len(mean)) + 1
+            ok = ~np.isnan(mean).any(axis=1) & ~np.isnan(cov).any(axis=(1, 2)) & (rows < T)
+            if not ok.any():
+                continue
+            L = batch_cholesky(cov[ok])
+            v = np.einsum("bij,pi->bpj", L, Wmat)                 # Lᵀw_p, shape (B, P, N)
+            mu_p = mean[ok] @ Wmat.T                               # (B, P)
+            if project:
+                v = batch_cholesky(np.einsum("bpj,bqj->bpq", v, v))   # L_p, portfolios on P normals
+            z = rng.standard_normal((int(ok.sum()), zdim, n_simulations))
+            add_counts(paths=int(ok.sum()) * n_simulations)
+            for p in range(0, P, portfolio_chunk):
+                cols = slice(p, min(p + portfolio_chunk, P))
+                yield rows[ok], cols, -(mu_p[:, cols, None] + v[:, cols] @ z)
+
+
+@instrument
+def rolling_montecarlo_var_es_batched(
+    return_dataframe: pd.DataFrame,
+    weights: dict[str, float],
+    alpha: float | Sequence[float] = 0.95,
+    window: int = 250,
+    n_simulations: int = 20000,
+    lagged: bool = True,
+    random_seed: int = 42,
+    block_size: int | None = None,
+    max_block_elements: int = 2 ** 24,
+    portfolio_draws: bool = False,
+    missing: str = "drop",
+) -> pd.Series:
+    """
+    Same model as rolling_montecarlo_var_es, but batched over dates:
+    - μ and Σ come from iter_rolling_moments (rank-one add/drop updates, no per-day mean()/np.cov),
+    - Cholesky factors for a whole block of dates in one call (batch_cholesky),
+    - normals for a block are drawn as one (B, N, n_simulations) tensor.
+
+    Numbers are drawn in the same order as in the loop (one (N, n_sims) matrix per valid date),
+    so for the same seed the VaR series is the same up to floating point rounding.
+
+    Portfolio returns are projected before simulating: w'(μ + L z) = w'μ + (Lᵀw)' z,
+    which is O(N·n_sims) per date instead of O(N²·n_sims) for L @ z.
+
+    block_size = dates simulated at once; by default picked so that B * (N + 1) * n_simulations <= max_block_elements
+    (the date's normals plus its losses, see _iter_batched_losses; B * n_simulations with portfolio_draws).
+    The rolling moments use their own, larger blocks (see _iter_batched_losses).
+
+    With the same stream most of the time is spent drawing the N * n_sims normals, which the loop has to draw
+    too, so the gain over rolling_montecarlo_var_es is modest (about 1.5x). portfolio_draws=True is the fast
+    path: it draws one normal per path, w'r ~ N(w'μ, |Lᵀw|²) exactly, so the model is the same and the time no
+    longer grows with N; only the random stream differs (results no longer match the loop number by number).
+
+    alpha can be a list: then the paths of each day are reused for every level and the result is
+    a wide frame with VaR and ES, columns MultiIndex (alpha, VaR/ES).
+
+    missing = "drop" (complete rows) or "pairwise" (iter_rolling_moments_pairwise), as in rolling_montecarlo_var_es.
+    """
+    multi = np.ndim(alpha) > 0
+    alphas = list(alpha) if multi else [alpha]
+    rng = np.random.default_rng(random_seed)
+    W = _weight_vector(list(return_dataframe.columns), weights)
+    idx = return_dataframe.index
+
+    var_vals = np.full((len(idx), len(alphas)), np.nan)
+    es_vals = np.full((len(idx), len(alphas)), np.nan)
+
+    for rows, _, losses in _iter_batched_losses(return_dataframe, W[None, :], window, n_simulations, rng,
+                                                block_size, max_block_elements, portfolio_draws, missing):
+        var_vals[rows], es_vals[rows] = tail_var_es(losses[:, 0], alphas, axis=1)
+
+    if multi:
+        out = var_es_frame(idx, alphas, var_vals, es_vals)
+        return out.shift(1) if lagged else out
+
+    var_series = pd.Series(var_vals[:, 0], index=idx)
+
+    if lagged:
+        var_series = var_series.shift(1)
+    return var_series.rename("VaR")
+
+
+def _chunk_paths(n_assets: int, max_memory_mb: float, reserved: int = 0) -> int:
+    """
+    Paths per chunk so that one chunk (normals + P&L and its temporary) plus `reserved` floats kept across chunks
+    stay under max_memory_mb. If `reserved` alone is over the cap, chunks are `reserved` paths long.
+    """
+    free = int(max_memory_mb * 2 ** 20) // 8 - reserved
+    if free < n_assets + 2:
+        return max(1, reserved)
+    return free // (n_assets + 2)
+
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Linear interpolation written the same way as numpy's quantile (so numbers match np.quantile)."""
+    diff = b - a
+    return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+
+def simulate_portfolio_losses(
+    mean: np.ndarray,
+    chol: np.ndarray,
+    W: np.ndarray,
+    n_simulations: int,
+    rng: np.random.Generator,
+    max_memory_mb: float = 64.0,
+) -> np.ndarray:
+    """
+    1-day portfolio losses -w'(μ + L z), generated in chunks of paths.
+    Only the portfolio P&L is kept (n_simulations floats); the (chunk, N) normals are dropped after each chunk,
+    so no (N, n_sims) matrix, no `correlated`/`shifted`/transposed copies.
+    """
+    v = chol.T @ W                     # Lᵀw, w'Lz = (Lᵀw)'z
+    mu_p = float(mean @ W)
+    chunk = _chunk_paths(len(W), max_memory_mb)
+    losses = np.empty(n_simulations)
+    z_buf = np.empty((min(chunk, n_simulations), len(W)))
+    for a in range(0, n_simulations, chunk):
+        b = min(a + chunk, n_simulations)
+        z = rng.standard_normal(out=z_buf[:b - a])
+        losses[a:b] = -(mu_p + z @ v)
+    return losses
+
+
+def streaming_var_es(
+    mean: np.ndarray,
+    chol: np.ndarray,
+    W: np.ndarray,
+    alphas: Sequence[float],
+    n_simulations: int,
+    rng: np.random.Generator,
+    max_memory_mb: float = 64.0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    MC VaR and ES without keeping the simulated sample.
+    Paths are generated in chunks and only a bounded tail buffer is kept:
+    the k largest losses, k = n - floor(α_min (n-1)), which is everything VaR/ES need for α >= α_min.
+    VaR is the linear quantile of the full sample (same as np.quantile), ES = mean(losses >= VaR).
+
+    max_memory_mb covers the tail buffer and one chunk together: one (k + chunk) array holds the kept tail and the
+    new chunk's P&L and is partitioned in place, the normals go into one reused (chunk, N) buffer, and the chunk
+    gets what is left of the cap after the k floats.
+    Only when the tail alone ((1-α_min) * n_simulations floats) is over the cap is the cap exceeded.
+    Returns (var, es), arrays of shape (A,).
+    """
+    alphas = np.asarray(alphas, dtype=float)
+    n = n_simulations
+    h = alphas * (n - 1)
+    lo = np.floor(h).astype(int)
+    k = n - int(lo.min())
+
+    v = chol.T @ W
+    mu_p = float(mean @ W)
+    chunk = _chunk_paths(len(W), max_memory_mb, reserved=k)
+    # P&L (= -loss), so the k largest losses are the k smallest entries and stay at the front after partitioning
+    buf = np.empty(k + chunk)
+    z_buf = np.empty((min(chunk, n), len(W)))
+    filled = 0
+    for a in range(0, n, chunk):
+        b = min(a + chunk, n)
+        z = rng.standard_normal(out=z_buf[:b - a])
+        buf[filled:filled + b - a] = mu_p + z @ v
+        filled += b - a
+        if filled > k:
+            buf[:filled].partition(k - 1)
+            filled = k
+    tail = -buf[:filled]
+    tail.sort()
+
+    # tail[j] is the (n-k+j)-th order statistic of the full sample
+    j = lo - (n - k)
+    hi = np.minimum(j + 1, k - 1)
+    var = _lerp(tail[j], tail[hi], h - lo)
+    es = np.array([tail[tail >= x].mean() for x in var])
+    return var, es
+
+
+@instrument
+def rolling_montecarlo_var_es_streaming(
+    return_dataframe: pd.DataFrame,
+    weights: dict[str, float],
+    alpha: float | Sequence[float] = 0.95,
+    window: int = 250,
+    n_simulations: int = 20000,
+    lagged: bool = True,
+    random_seed: int = 42,
+    max_memory_mb: float = 64.0,
+) -> pd.DataFrame:
+    """
+    Memory-bounded Monte Carlo VaR AND ES (same windows and model as rolling_montecarlo_var_es).
+    μ, Σ and Cholesky factors come in date blocks (iter_rolling_moments + batch_cholesky),
+    then each day is simulated in path chunks with a tail buffer (streaming_var_es),
+    so peak memory is set by max_memory_mb and not by N * n_simulations.
+
+    Paths are drawn chunk by chunk, so the random stream differs from the loop / batched engines
+    (same distribution, not the same numbers).
+
+    Returns DataFrame with VaR and ES, or columns MultiIndex (alpha, VaR/ES) if alpha is a list.
+    """
+    multi = np.ndim(alpha) > 0
+    alphas = list(alpha) if multi else [alpha]
+    rng = np.random.default_rng(random_seed)
+    cols = list(return_dataframe.columns)
+    W = _weight_vector(cols, weights)
+    idx = return_dataframe.index
+
+    var_vals = np.full((len(idx), len(alphas)), np.nan)
+    es_vals = np.full((len(idx), len(alphas)), np.nan)
+
+    # keep a block of Cholesky factors well under the cap as well
+    block = max(1, int(max_memory_mb * 2 ** 20) // (8 * 4 * max(1, len(cols)) ** 2))
+    for sl, count, mean, cov in iter_rolling_moments(return_dataframe, window, block_size=block):
+        rows = np.arange(sl.start, sl.stop) + 1
+        ok = ~np.isnan(mean).any(axis=1) & (rows < len(idx))
+        if not ok.any():
+            continue
+        L = batch_cholesky(cov[ok])
+        add_counts(paths=int(ok.sum()) * n_simulations)
+        for i, row in enumerate(rows[ok]):
+            var_vals[row], es_vals[row] = streaming_var_es(
+                mean[ok][i], L[i], W, alphas, n_simulations, rng, max_memory_mb
+            )
+
+    out = var_es_frame(idx, alphas, var_vals, es_vals) if multi else pd.DataFrame(
+        {"VaR": var_vals[:, 0], "ES": es_vals[:, 0]}, index=idx
+    )
+    if lagged:
+        out = out.shift(1)
+    return out
+
+
+def _pca_loadings(Xc: np.ndarray, n_factors: int) -> np.ndarray:
+    """
+    Top-K principal directions of a centered window Xc (n x N), shape (N, K).
+    When N > n the n x n Gram matrix is decomposed instead of the N x N covariance
+    (same directions, O(n²N) instead of O(N³)).
+    """
+    n, N = Xc.shape
+    K = min(n_factors, n - 1, N)
+    if N <= n:
+        vals, vecs = np.linalg.eigh(Xc.T @ Xc)
+        return vecs[:, ::-1][:, :K]
+    vals, u = np.linalg.eigh(Xc @ Xc.T)
+    vals, u = vals[::-1][:K], u[:, ::-1][:, :K]
+    return (Xc.T @ u) / np.sqrt(np.maximum(vals, 1e-300))
+
+
+@instrument
+def rolling_factor_montecarlo_var_es(
+    return_dataframe: pd.DataFrame,
+    weights: dict[str, float],
+    alpha: float | Sequence[float] = 0.95,
+    window: int = 250,
+    n_simulations: int = 20000,
+    lagged: bool = True,
+    random_seed: int = 42,
+    n_factors: int = 5,
+    refit_every: int = 1,
+) -> pd.Series | pd.DataFrame:
+    """
+    Factor-structured Monte Carlo, drop-in for rolling_montecarlo_var_es (same windows, same return types).
+    r = μ + V f + e,   f ~ N(0, Σ_f) (K statistical/PCA factors),   e ~ N(0, diag(ψ)) idiosyncratic.
+
+    - No N x N covariance and no N x N Cholesky: only K x K (Σ_f) per day, so it keeps working when
+      N > window (sample Σ is rank-deficient there and Cholesky needs the 1e-8·I fallback).
+    - We simulate the K factors + one idiosyncratic term: for the portfolio w'e ~ N(0, Σ_i w_i² ψ_i) exactly,
+      so per day it is (n_sims, K+1) normals instead of (N, n_sims).
+    - refit_every = k re-estimates the PCA directions V every k days; in between V is kept,
+      Σ_f and ψ are re-estimated from the window (O(n·N·K)).
+
+    ψ_i = var_i - (V Σ_f Vᵀ)_ii, clipped at 0.
+    Returns VaR Series (or wide VaR/ES frame, columns MultiIndex (alpha, VaR/ES), if alpha is a list).
+    """
+    return_dataframe = as_frame(return_dataframe)
+    multi = np.ndim(alpha) > 0
+    alphas = list(alpha) if multi else [alpha]
+    rng = np.random.default_rng(random_seed)
+    cols = list(return_dataframe.columns)
+    W = _weight_vector(cols, weights)
+    idx = return_dataframe.index
+    X = return_dataframe.to_numpy(dtype=float)
+    complete = ~np.isnan(X).any(axis=1)
 
-    var_series = pd.Series(var_vals, index=idx)
+    var_vals = np.full((len(idx), len(alphas)), np.nan)
+    es_vals = np.full((len(idx), len(alphas)), np.nan)
+    V = None
+    since_fit = 0
+
+    for t in range(window, len(idx)):
+        win = X[t - window:t][complete[t - window:t]]
+        n = win.shape[0]
+        if n < 2:
+            continue
+        mean = win.mean(axis=0)
+        Xc = win - mean
 
+        if V is None or since_fit >= refit_every:
+            V = _pca_loadings(Xc, n_factors)
+            since_fit = 0
+        since_fit += 1
+
+        F = Xc @ V                                   # factor returns in the window (n, K)
+        cov_f = F.T @ F / (n - 1)
+        var_i = (Xc * Xc).sum(axis=0) / (n - 1)
+        psi = np.maximum(var_i - np.einsum("ik,kl,il->i", V, cov_f, V), 0.0)
+
+        try:
+            L_f = np.linalg.cholesky(cov_f)
+        except np.linalg.LinAlgError:
+            L_f = np.linalg.cholesky(cov_f + 1e-12 * np.eye(cov_f.shape[0]))
+
+        b = V.T @ W                                  # portfolio factor exposures (K,)
+        sd_e = np.sqrt(float(W ** 2 @ psi))
+
+        z = rng.standard_normal((n_simulations, V.shape[1] + 1))
+        add_counts(paths=n_simulations)
+        f = z[:, :-1] @ L_f.T                        # simulated factor returns (n_sims, K)
+        portfolio_sims = mean @ W + f @ b + sd_e * z[:, -1]
+        var_vals[t], es_vals[t] = tail_var_es(-portfolio_sims, alphas)
+
+    if multi:
+        out = var_es_frame(idx, alphas, var_vals, es_vals)
+        return out.shift(1) if lagged else out
+
+    var_series = pd.Series(var_vals[:, 0], index=idx)
     if lagged:
         var_series = var_series.shift(1)
-    return var_series.rename("VaR")
\ No newline at end of file
+    return var_series.rename("VaR")
+
+
+SAMPLING_SCHEMES = ("plain", "antithetic", "sobol", "importance")
+
+
+def _sobol_engine(dim: int, rng: np.random.Generator):
+    from scipy.stats import qmc
+    try:
+        return qmc.Sobol(dim, scramble=True, rng=rng)
+    except TypeError:  # scipy < 1.15
+        return qmc.Sobol(dim, scramble=True, seed=rng)
+
+
+def _weighted_var_es(losses: np.ndarray, lr: np.ndarray, alphas: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Importance-sampling VaR/ES with likelihood-ratio weights lr:
+    VaR_α = smallest loss x with (1/n) Σ lr·1{L >= x} >= 1-α (losses walked from the largest down),
+    ES_α  = Σ lr·L·1{L >= VaR} / Σ lr·1{L >= VaR}.
+    """
+    order = np.argsort(losses)[::-1]
+    l, w = losses[order], lr[order]
+    tail_prob = np.cumsum(w) / l.size
+    k = np.minimum(np.searchsorted(tail_prob, 1 - alphas), l.size - 1)
+    var = l[k]
+    cw, cwl = np.cumsum(w), np.cumsum(w * l)
+    es = cwl[k] / cw[k]
+    return var, es
+
+
+def montecarlo_var_es_vr(
+    mean: np.ndarray,
+    chol: np.ndarray,
+    W: np.ndarray,
+    alpha: float | Sequence[float],
+    n_simulations: int = 2000,
+    sampling: str = "sobol",
+    rng: np.random.Generator | None = None,
+    n_batches: int = 16,
+    target_se: float | None = None,
+    max_simulations: int = 1_000_000,
+) -> dict[str, np.ndarray | int]:
+    """
+    One-day MC VaR/ES with a variance-reduced sampler and its standard error.
+
+    sampling:
+    - "plain":      pseudo-random normals (reference)
+    - "antithetic": every z is paired with -z
+    - "sobol":      scrambled Sobol points -> Φ⁻¹ (randomized QMC, every batch is an independent scrambling)
+    - "importance": z ~ N(θ, I) shifted into the loss tail along -Lᵀw, |θ| = z_α (α = highest level),
+                    each path weighted by the likelihood ratio exp(-θ'z + θ'θ/2)
+
+    Paths are split into n_batches independent batches: the point estimate uses all paths,
+    the standard error is std(batch estimates) / sqrt(n_batches).
+    With target_se, the batches keep growing (doubling the paths) until VaR_se <= target_se
+    for every alpha, or max_simulations is reached; n_simulations is then only the starting size.
+
+    Returns dict with VaR, ES, VaR_se, ES_se (arrays, one value per alpha) and n_paths.
+    """
+    if sampling not in SAMPLING_SCHEMES:
+        raise ValueError(f"sampling must be one of {SAMPLING_SCHEMES}, got {sampling!r}.")
+    rng = np.random.default_rng() if rng is None else rng
+    alphas = np.atleast_1d(np.asarray(alpha, dtype=float))
+    N = len(W)
+    v = chol.T @ W
+    mu_p = float(mean @ W)
+
+    theta = None
+    if sampling == "importance":
+        from scipy.stats import norm
+        norm_v = np.linalg.norm(v)
+        theta = -norm.ppf(alphas.max()) * v / (norm_v if norm_v > 0 else 1.0)
+    engines = [_sobol_engine(N, rng) for _ in range(n_batches)] if sampling == "sobol" else None
+
+    def _draw(b: int, m: int) -> np.ndarray:
+        if sampling == "antithetic":
+            half = rng.standard_normal(((m + 1) // 2, N))
+            return np.concatenate([half, -half])[:m]
+        if sampling == "sobol":
+            from scipy.stats import norm
+            u = engines[b].random(m)
+            return norm.ppf(np.clip(u, 1e-12, 1 - 1e-12))
+        z = rng.standard_normal((m, N))
+        return z + theta if theta is not None else z
+
+    losses = [np.empty(0) for _ in range(n_batches)]
+    lrs = [np.empty(0) for _ in range(n_batches)]
+    per_batch = max(2, -(-n_simulations // n_batches))
+    if sampling == "sobol":
+        per_batch = 1 << int(np.ceil(np.log2(per_batch)))   # Sobol balance needs powers of 2
+
+    new = per_batch
+    while True:
+        for b in range(n_batches):
+            z = _draw(b, new)
+            losses[b] = np.concatenate([losses[b], -(mu_p + z @ v)])
+            lr = np.exp(-z @ theta + 0.5 * theta @ theta) if theta is not None else np.ones(new)
+            lrs[b] = np.concatenate([lrs[b], lr])
+
+        if theta is None:
+            est = [tail_var_es(x, alphas) for x in losses]
+            var, es = tail_var_es(np.concatenate(losses), alphas)
+        else:
+            est = [_weighted_var_es(x, w, alphas) for x, w in zip(losses, lrs)]
+            var, es = _weighted_var_es(np.concatenate(losses), np.concatenate(lrs), alphas)
+        var_se = np.std([e[0] for e in est], axis=0, ddof=1) / np.sqrt(n_batches)
+        es_se = np.std([e[1] for e in est], axis=0, ddof=1) / np.sqrt(n_batches)
+
+        n_paths = n_batches * losses[0].size
+        if target_se is None or np.all(var_se <= target_se) or 2 * n_paths > max_simulations:
+            break
+        new = losses[0].size          # double every batch
+
+    return {"VaR": var, "ES": es, "VaR_se": var_se, "ES_se": es_se, "n_paths": n_paths}
+
+
+@instrument
+def rolling_montecarlo_var_es_vr(
+    return_dataframe: pd.DataFrame,
+    weights: dict[str, float],
+    alpha: float | Sequence[float] = 0.95,
+    window: int = 250,
+    n_simulations: int = 2000,
+    lagged: bool = True,
+    random_seed: int = 42,
+    sampling: str = "sobol",
+    n_batches: int = 16,
+    target_se: float | None = None,
+    max_simulations: int = 1_000_000,
+) -> pd.DataFrame:
+    """
+    Rolling MC VaR/ES (same windows as rolling_montecarlo_var_es) with a variance-reduced sampler
+    (see montecarlo_var_es_vr), reporting the standard error of every estimate.
+
+    Columns: VaR, ES, VaR_se, ES_se, n_paths
+    (or MultiIndex (alpha, stat) if alpha is a list; n_paths is then repeated per alpha).
+    """
+    multi = np.ndim(alpha) > 0
+    alphas = list(alpha) if multi else [alpha]
+    rng = np.random.default_rng(random_seed)
+    cols = list(return_dataframe.columns)
+    W = _weight_vector(cols, weights)
+    idx = return_dataframe.index
+    stats = ["VaR", "ES", "VaR_se", "ES_se", "n_paths"]
+    out = np.full((len(idx), len(alphas), len(stats)), np.nan)
+
+    for sl, count, mean, cov in iter_rolling_moments(return_dataframe, window):
+        rows = np.arange(sl.start, sl.stop) + 1
+        ok = ~np.isnan(mean).any(axis=1) & (rows < len(idx))
+        if not ok.any():
+            continue
+        L = batch_cholesky(cov[ok])
+        for i, row in enumerate(rows[ok]):
+            res = montecarlo_var_es_vr(
+                mean[ok][i], L[i], W, alphas, n_simulations, sampling, rng,
+                n_batches=n_batches, target_se=target_se, max_simulations=max_simulations,
+            )
+            out[row] = np.column_stack([res[s] * np.ones(len(alphas)) for s in stats])
+            add_counts(paths=int(res["n_paths"]))
+
+    if multi:
+        columns = pd.MultiIndex.from_product([alphas, stats], names=["alpha", "stat"])
+        frame = pd.DataFrame(out.reshape(len(idx), -1), index=idx, columns=columns)
+    else:
+        frame = pd.DataFrame(out[:, 0, :], index=idx, columns=stats)
+    if lagged:
+        frame = frame.shift(1)
+    return frame
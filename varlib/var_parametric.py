@@ -1,6 +1,13 @@
+from typing import Sequence
+
 import numpy as np
 import pandas as pd
-from scipy.stats import norm
+
+from varlib.instrument import instrument
+from varlib.moments import MomentSeries, _raw_values, rolling_moments
+from varlib.return_matrix import ReturnMatrix, as_frame, as_series
+from varlib.returns import normalize_weights
+from varlib.tail import var_es_frame
 
 
 def emwa_vol(returns: pd.Series, lam: float = 0.94, min_periods: int = 30) -> pd.Series:
@@ -25,9 +32,10 @@ def emwa_vol(returns: pd.Series, lam: float = 0.94, min_periods: int = 30) -> pd
     return sig
 
 
+@instrument
 def rolling_parametric_var_es(
     portfolio_returns: pd.Series,
-    alpha: float = 0.95,
+    alpha: float | Sequence[float] = 0.95,
     window: int = 250,
     distribution: str = "normal",
     use_ewma: bool = False,
@@ -43,7 +51,12 @@ def rolling_parametric_var_es(
     mu (μ) = mean
     σ is EMWA (fast tracks changes, especially 2008 or 2020) or classical std (smoother, but slower reaction)
     ddof=1: unbiased assessment(procena)
+
+    If alpha is a list, μ and σ are computed once and every level is read from them;
+    the result is a wide frame with columns MultiIndex (alpha, VaR/ES).
     """
+    from scipy.stats import norm
+    portfolio_returns = as_series(portfolio_returns)
     if use_ewma:
         mean = portfolio_returns.rolling(window=window).mean()
         sigma = emwa_vol(portfolio_returns, lam=ewma_lambda)
@@ -51,12 +64,21 @@ def rolling_parametric_var_es(
         mean = portfolio_returns.rolling(window=window).mean()
         sigma = portfolio_returns.rolling(window=window).std(ddof=1)
 
-    # (α-quantile of standard normal, 0.99 -> 2.3263, 0.95 -> 1.6449)
-    z = norm.ppf(alpha)
     # loss convention, positive means loss.
     mean_L = -mean
     sigma_L = sigma
 
+    if np.ndim(alpha) > 0:
+        a = np.asarray(alpha, dtype=float)
+        z = norm.ppf(a)
+        var = mean_L.to_numpy()[:, None] + z * sigma_L.to_numpy()[:, None]
+        es = mean_L.to_numpy()[:, None] + sigma_L.to_numpy()[:, None] * norm.pdf(z) / (1 - a)
+        out = var_es_frame(portfolio_returns.index, list(alpha), var, es)
+        return out.shift(1) if lagged else out
+
+    # (α-quantile of standard normal, 0.99 -> 2.3263, 0.95 -> 1.6449)
+    z = norm.ppf(alpha)
+
     # VaR & ES formulas (normal distribution)
     var_series = mean_L + z * sigma_L
     es_series = mean_L + (sigma_L * norm.pdf(z) / (1 - alpha))
@@ -67,13 +89,115 @@ def rolling_parametric_var_es(
     return out
 
 
+def ewma_covariance(
+    return_dataframe: pd.DataFrame | ReturnMatrix,
+    lam: float = 0.94,
+    min_periods: int = 30,
+    window: int = 250,
+    block_size: int = 64,
+    dtype=np.float64,
+) -> MomentSeries:
+    """
+    RiskMetrics EWMA covariance, the matrix version of emwa_vol:
+    Σ_t = λ Σ_{t-1} + (1-λ) r_t r_tᵀ,  Σ_0 = r_0 r_0ᵀ   (same recursion as .ewm(adjust=False) on r²)
+
+    The recursion is done in blocks of dates: inside a block
+    Σ_{a+j} = λ^{j+1} Σ_{a-1} + (1-λ) Σ_{i<=j} λ^{j-i} r_{a+i} r_{a+i}ᵀ,
+    which is one cumulative sum of scaled outer products (no Python step per date).
+    Missing returns count as 0 (no move that day).
+
+    mean is the rolling `window` mean (as in rolling_parametric_var_es with use_ewma=True), with missing returns
+    as 0 like the recursion, so one missing cell does not blank out a whole window of dates.
+    count is the number of complete rows in that `window` (NaN before the first full window), as in rolling_moments;
+    Σ_t itself weights every date so far.
+    First min_periods-1 covariances are NaN. Stored as (T, N, N) in `dtype` (float32 halves the memory).
+    A ReturnMatrix is read in place; only the current block is converted to float64.
+    """
+    X = _raw_values(return_dataframe)
+    T, N = X.shape
+    cov = np.empty((T, N, N), dtype=dtype)
+    prev = None
+    for a in range(0, T, block_size):
+        b = min(a + block_size, T)
+        x = np.nan_to_num(X[a:b].astype(np.float64))
+        j = np.arange(b - a)
+        outer = x[:, :, None] * x[:, None, :]
+        if prev is None:
+            # Σ_0 = r_0 r_0ᵀ, then the recursion from there
+            prev = outer[0]
+            outer, x, j, a = outer[1:], x[1:], j[1:] - 1, a + 1
+            cov[0] = prev
+        if len(j):
+            scaled = np.cumsum(outer * (lam ** -j)[:, None, None], axis=0)
+            block = (lam ** (j + 1))[:, None, None] * prev + (1 - lam) * (lam ** j)[:, None, None] * scaled
+            cov[a:b] = block
+            prev = block[-1]
+    cov[:min_periods - 1] = np.nan
+
+    return_dataframe = as_frame(return_dataframe)
+    mean = return_dataframe.fillna(0.0).rolling(window=window).mean().to_numpy(dtype=dtype)
+    count = return_dataframe.notna().all(axis=1).rolling(window=window).sum().to_numpy(dtype=float)
+    return MomentSeries(return_dataframe.index, return_dataframe.columns, count, mean, cov)
+
+
+def covariance_var_es(
+    moments: MomentSeries,
+    weights: dict[str, float],
+    alpha: float | Sequence[float] = 0.95,
+    lagged: bool = True,
+) -> pd.DataFrame:
+    """
+    Delta-normal VaR/ES for one weight vector from a stored covariance series (rolling_moments or ewma_covariance).
+    μ_p,t = w'μ_t,  σ²_p,t = w'Σ_t w  -> one vectorized quadratic form over all T dates.
+    Then the same formulas as rolling_parametric_var_es:
+    VaR_α = -μ_p + z_α σ_p,  ES_α = -μ_p + σ_p φ(z_α)/(1-α).
 
+    Weights are normalized like portfolio_returns (sum to 1, missing tickers = 0).
+    The covariance series is computed once and reused for any number of weight vectors.
+    """
+    from scipy.stats import norm
+    W = normalize_weights(weights).reindex(moments.columns).fillna(0.0).to_numpy(dtype=moments.cov.dtype)
+    mean_L = -(moments.mean @ W).astype(float)
+    sigma_L = np.sqrt(np.einsum("tij,i,j->t", moments.cov, W, W).astype(float))
+
+    a = np.atleast_1d(np.asarray(alpha, dtype=float))
+    z = norm.ppf(a)
+    var = mean_L[:, None] + z * sigma_L[:, None]
+    es = mean_L[:, None] + sigma_L[:, None] * norm.pdf(z) / (1 - a)
+
+    if np.ndim(alpha) > 0:
+        out = var_es_frame(moments.index, list(alpha), var, es)
+    else:
+        out = pd.DataFrame({"VaR": var[:, 0], "ES": es[:, 0]}, index=moments.index)
+    if lagged:
+        out = out.shift(1)
+    return out
 
 
-
-
-
-
-
-
-
+@instrument
+def rolling_covariance_var_es(
+    return_dataframe: pd.DataFrame,
+    weights: dict[str, float],
+    alpha: float | Sequence[float] = 0.95,
+    window: int = 250,
+    cov_source: str = "sample",
+    ewma_lambda: float = 0.94,
+    lagged: bool = True,
+    dtype=np.float64,
+    missing: str = "drop",
+) -> pd.DataFrame:
+    """
+    Multi-asset delta-normal model: covariance series + covariance_var_es.
+    cov_source = "sample" (rolling window, complete rows) or "ewma" (RiskMetrics recursion).
+    missing = "pairwise" makes the sample covariance pairwise-complete (ragged histories, see rolling_moments);
+    the EWMA recursion always counts a missing return as 0.
+    For several weight vectors build the covariance once (rolling_moments / ewma_covariance)
+    and call covariance_var_es for each.
+    """
+    if cov_source == "sample":
+        moments = rolling_moments(return_dataframe, window, dtype=dtype, missing=missing)
+    elif cov_source == "ewma":
+        moments = ewma_covariance(return_dataframe, lam=ewma_lambda, window=window, dtype=dtype)
+    else:
+        raise ValueError(f"cov_source must be 'sample' or 'ewma', got {cov_source!r}.")
+    return covariance_var_es(moments, weights, alpha=alpha, lagged=lagged)